@@ -0,0 +1,49 @@
+"""Compares frame-by-frame processing with ImageProcessor.process_batch at several resolutions.
+
+Run from the repository root: python benchmarks/batch.py [--frames 64]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.image_processor import ImageProcessor
+
+RESOLUTIONS = [(160, 120), (320, 240), (640, 480), (1920, 1080)]
+
+def frames_per_second(run, count, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=64, help="frames per clip (1080p uses a quarter)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    processor = ImageProcessor()
+    processor.saturation = 2.0
+    processor.brightness = 10
+    processor.apply_blending = True
+    processor.selected_blending_mode = "Overlay"
+
+    rng = np.random.default_rng(0)
+    print(f"{'resolution':>12} {'per frame':>12} {'batch':>12} {'speedup':>8}")
+    for width, height in RESOLUTIONS:
+        count = args.frames if width < 1920 else max(1, args.frames // 4)
+        clip = rng.integers(0, 256, (count, height, width, 3), dtype=np.uint8)
+        processor.process_batch(clip)  # Warm up the buffer arena
+
+        single = frames_per_second(lambda: [processor.process_frame(frame) for frame in clip], count, args.repeats)
+        batch = frames_per_second(lambda: processor.process_batch(clip), count, args.repeats)
+        print(f"{width}x{height:<7} {single:9.1f} fps {batch:9.1f} fps {batch / single:7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compares the OpenCV and Numba LVN backends at 1080p and 4K.
+
+Run from the repository root: python benchmarks/lvn.py [--repeat 1] [--smoothness 5]
+The first Numba call compiles the kernels (cached on disk afterwards) and is excluded from the timings.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.image_processor import ImageProcessor
+from src import lvn_numba
+
+RESOLUTIONS = [(1920, 1080), (3840, 2160)]
+
+def seconds_per_call(processor, frame, runs):
+    processor.apply_local_variance_normalization(frame)  # Warm up buffers and the JIT
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        processor.apply_local_variance_normalization(frame)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1, help="LVN repeat count")
+    parser.add_argument("--smoothness", type=float, default=5, help="LVN smoothness (kernel size is 2 * smoothness + 1)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if not lvn_numba.NUMBA_AVAILABLE:
+        print("Numba is not installed; only the OpenCV backend can be measured.")
+
+    rng = np.random.default_rng(0)
+    print(f"{'resolution':>12} {'OpenCV':>10} {'Numba':>10} {'speedup':>8}")
+    for width, height in RESOLUTIONS:
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        timings = {}
+        for backend in ("OpenCV", "Numba") if lvn_numba.NUMBA_AVAILABLE else ("OpenCV",):
+            processor = ImageProcessor()
+            processor.lvn_backend = backend
+            processor.repeat = args.repeat
+            processor.smoothness = args.smoothness
+            timings[backend] = seconds_per_call(processor, frame, args.runs)
+
+        numba_time = timings.get("Numba")
+        print(f"{width}x{height:<7} {timings['OpenCV'] * 1000:7.1f} ms "
+              + (f"{numba_time * 1000:7.1f} ms {timings['OpenCV'] / numba_time:7.2f}x" if numba_time else "       -"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Measures import time, first-frame latency and worker spawn time of the headless core.
+
+Run from the repository root: python benchmarks/startup.py [--output results.jsonl]
+Each measurement runs in a fresh interpreter so nothing is already imported or cached.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every snippet prints one JSON object with its own timings
+IMPORT_CORE = """
+import json, sys, time
+start = time.perf_counter()
+from src.image_processor import ImageProcessor
+from src.video_source_manager import VideoSourceManager
+print(json.dumps({"seconds": time.perf_counter() - start, "qt_loaded": "PyQt5" in sys.modules}))
+"""
+
+IMPORT_ENTRY_POINT = """
+import json, sys, time
+start = time.perf_counter()
+import lvndr
+print(json.dumps({"seconds": time.perf_counter() - start, "qt_loaded": "PyQt5" in sys.modules}))
+"""
+
+FIRST_FRAME = """
+import json, time
+start = time.perf_counter()
+import numpy as np
+from src.image_processor import ImageProcessor
+processor = ImageProcessor()
+processor.apply_lvn_to_base = True
+frame = np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+ready = time.perf_counter()
+processor.process_frame(frame)
+done = time.perf_counter()
+print(json.dumps({"seconds": done - start, "frame_seconds": done - ready}))
+"""
+
+WORKER_SPAWN = """
+import json, multiprocessing, time
+from concurrent.futures import ProcessPoolExecutor
+import lvndr  # Spawned workers re-import this, just like a pool started from the app imports lvndr.py
+
+def warm_up():
+    from src.image_processor import ImageProcessor
+    ImageProcessor()
+    return True
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(warm_up) for _ in range(WORKERS)]
+        [future.result() for future in futures]
+    print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+def run_snippet(code):
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_script(code, path):
+    with open(path, "w") as f:
+        f.write(code)
+    try:
+        result = subprocess.run([sys.executable, path], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    finally:
+        os.remove(path)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def best_of(runs, measure):
+    results = [measure() for _ in range(runs)]
+    return min(results, key=lambda result: result["seconds"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="repetitions per measurement, the best is reported")
+    parser.add_argument("--workers", type=int, default=4, help="number of spawned worker processes")
+    parser.add_argument("--output", help="append the results as one JSON line to this file")
+    args = parser.parse_args()
+
+    spawn_code = WORKER_SPAWN.replace("WORKERS", str(args.workers))
+    spawn_path = os.path.join(REPO_ROOT, "_spawn_benchmark.py")
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "import_core": best_of(args.runs, lambda: run_snippet(IMPORT_CORE)),
+        "import_entry_point": best_of(args.runs, lambda: run_snippet(IMPORT_ENTRY_POINT)),
+        "first_frame_1080p": best_of(args.runs, lambda: run_snippet(FIRST_FRAME)),
+        "worker_spawn": best_of(args.runs, lambda: run_script(spawn_code, spawn_path)),
+    }
+
+    print(f"Import core:          {results['import_core']['seconds'] * 1000:8.1f} ms (Qt loaded: {results['import_core']['qt_loaded']})")
+    print(f"Import lvndr.py:      {results['import_entry_point']['seconds'] * 1000:8.1f} ms (Qt loaded: {results['import_entry_point']['qt_loaded']})")
+    print(f"First frame (1080p):  {results['first_frame_1080p']['seconds'] * 1000:8.1f} ms "
+          f"({results['first_frame_1080p']['frame_seconds'] * 1000:.1f} ms processing)")
+    print(f"Spawn {args.workers} workers:      {results['worker_spawn']['seconds'] * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(results) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,103 @@
+from src.batch_runner import BatchRunner
 from src.image_processor import ImageProcessor
+from src.preset_bank import PresetBank
 from src.video_source_manager import VideoSourceManager
-from PyQt5 import QtWidgets
-from src.gui_manager import MainWindow
+import argparse
+import json
 import sys
 
-def main():
+def run_gui(processor, video_manager):
+    # Qt is only needed for the controls window, so headless runs and worker processes never import it
+    from PyQt5 import QtWidgets
+    from src.gui_manager import MainWindow
+
     app = QtWidgets.QApplication(sys.argv)
-    processor = ImageProcessor()
-    video_manager = VideoSourceManager(processor)
     gui = MainWindow(processor, video_manager)
     gui.show()
     sys.exit(app.exec_())
 
+def run_headless(video_manager, video=None, webcam=0, crossfade_frames=0):
+    # Number keys in the video window switch between the presets in the presets folder
+    bank = PresetBank().load()
+
+    def switch_preset(key):
+        if key in "123456789":
+            bank.switch(video_manager.processor, int(key) - 1, crossfade_frames)
+
+    video_manager.on_key = switch_preset
+    if video:
+        video_manager.start_video_file(video)
+    else:
+        video_manager.start_webcam(webcam)
+    try:
+        video_manager.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        video_manager.close()
+
+def run_batch(preset_path, input_dir, output_dir, workers=None):
+    settings = {}
+    if preset_path:
+        with open(preset_path, 'r') as f:
+            settings = ImageProcessor.preset_settings(json.load(f))
+    try:
+        summary = BatchRunner(settings, input_dir, output_dir, workers).run()
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume.")
+        return 1
+    return 1 if summary["errors"] else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Glitch a webcam or video feed with LVN and the Wordpad effect.")
+    parser.add_argument("--headless", action="store_true", help="run without the controls window (PyQt5 is not needed)")
+    parser.add_argument("--video", help="video file to play in headless mode, defaults to the webcam")
+    parser.add_argument("--webcam", type=int, default=0, help="webcam index to use in headless mode")
+    parser.add_argument("--preset", help="preset file to apply in headless and batch mode")
+    parser.add_argument("--batch", nargs=2, metavar=("INPUT", "OUTPUT"), help="process every image under INPUT into OUTPUT and exit")
+    parser.add_argument("--workers", type=int, help="worker processes for batch mode, defaults to the number of CPUs")
+    parser.add_argument("--crossfade", type=int, default=0, help="frames to crossfade over when switching presets with the number keys")
+    parser.add_argument("--governor", action="store_true", help="start with the adaptive frame-rate governor enabled")
+    parser.add_argument("--target-fps", type=float, help="frame rate the governor aims for (default 30)")
+    parser.add_argument("--governor-priority", help="comma separated knobs in the order the governor degrades them, "
+                        "from blur, repeat and proxy_scale (default blur,repeat,proxy_scale)")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-log", help="append a metrics summary to this .csv or .jsonl file")
+    parser.add_argument("--metrics-interval", type=float, default=60.0, help="seconds between metrics log rows")
+    args = parser.parse_args()
+
+    processor = ImageProcessor()
+    video_manager = VideoSourceManager(processor)
+    governor = video_manager.governor
+    if args.governor_priority:
+        try:
+            governor.set_priority([knob.strip() for knob in args.governor_priority.split(",") if knob.strip()])
+        except ValueError as e:
+            parser.error(str(e))
+    if args.target_fps:
+        governor.set_target_fps(args.target_fps)
+    if args.governor:
+        governor.set_enabled(True)
+    if args.metrics_port:
+        video_manager.start_metrics_server(args.metrics_port)
+    if args.metrics_log:
+        video_manager.start_metrics_log(args.metrics_log, args.metrics_interval)
+
+    try:
+        if args.batch:
+            sys.exit(run_batch(args.preset, args.batch[0], args.batch[1], args.workers))
+        elif args.headless:
+            if args.preset:
+                with open(args.preset, 'r') as f:
+                    processor.apply_preset(json.load(f))
+            run_headless(video_manager, args.video, args.webcam, args.crossfade)
+        else:
+            run_gui(processor, video_manager)
+    finally:
+        video_manager.stop_metrics()
+
 if __name__ == "__main__":
     main()
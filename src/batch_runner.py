@@ -0,0 +1,220 @@
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from src.image_processor import ImageProcessor
+
+# The processor of a worker process, set up once by _init_worker
+_worker_processor = None
+
+def _init_worker(settings):
+    global _worker_processor
+    # Ctrl+C is handled by the main process, which lets running images finish and records them
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_processor = ImageProcessor()
+    _worker_processor.apply_settings(settings)
+    # Folders mix sizes and orientations, so only the buffers of the current image's shape are kept
+    _worker_processor.arena.max_idle_frames = 0
+
+def _process_image(file, image):
+    """Runs in a worker process; encoding happens here too so the writer thread only touches the disk."""
+    extension = os.path.splitext(file)[1]
+    ok, encoded = cv2.imencode(extension, _worker_processor.process_frame(image))
+    if not ok:
+        raise ValueError(f"could not encode {extension} image")
+    return encoded
+
+
+class BatchRunner:
+    """Runs every image under a folder through a processor with the given settings and writes the results to a
+    mirrored folder.
+
+    Images are processed in worker processes, since the Wordpad glitch's regex holds the GIL. A reader thread loads
+    images ahead of the pool and a writer thread saves the results, so disk access overlaps processing. Every finished
+    file is appended to a manifest in the output folder, and a rerun skips them.
+    """
+
+    image_extensions = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+    manifest_name = "lvndr-manifest.jsonl"
+
+    def __init__(self, settings, input_dir, output_dir, max_workers=None, read_ahead=None, report_interval=5.0):
+        self.settings = settings  # Processor attributes, as returned by ImageProcessor.preset_settings
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.max_workers = max_workers or os.cpu_count() or 2
+        # Images held between reading and writing, which bounds memory use on large folders
+        self.read_ahead = read_ahead or self.max_workers * 2
+        self.report_interval = report_interval
+
+        self.total = 0
+        self.skipped = 0
+        self.processed = 0
+        self.errors = []  # (file, message) for every file that failed in this run
+        self.started_at = None
+        self.last_report = None
+
+    def find_images(self):
+        """Returns the images under the input folder relative to it, sorted so frame sequences stay in order."""
+        output_dir = os.path.abspath(self.output_dir)
+        files = []
+        for root, dirs, names in os.walk(self.input_dir):
+            # Never pick up our own results when the output folder is inside the input folder
+            dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != output_dir)
+            for name in sorted(names):
+                if name.lower().endswith(self.image_extensions):
+                    files.append(os.path.relpath(os.path.join(root, name), self.input_dir).replace(os.sep, "/"))
+        return files
+
+    def manifest_path(self):
+        return os.path.join(self.output_dir, self.manifest_name)
+
+    def load_manifest(self):
+        """Returns the files an earlier run finished; files that failed are tried again."""
+        done = set()
+        try:
+            with open(self.manifest_path(), 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short when the earlier run was killed
+                    if entry.get("status") == "done":
+                        done.add(entry["file"])
+        except OSError:
+            pass
+        return done
+
+    @staticmethod
+    def read_image(path):
+        # imdecode instead of imread so paths with non-ASCII characters work on Windows
+        image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("not a readable image")
+        return image
+
+    def run(self):
+        """Processes every image not finished by an earlier run and returns a summary of this run."""
+        if os.path.abspath(self.output_dir) == os.path.abspath(self.input_dir):
+            raise ValueError("the output folder must not be the input folder")
+        os.makedirs(self.output_dir, exist_ok=True)
+        files = self.find_images()
+        done = self.load_manifest()
+        pending = [file for file in files if file not in done]
+        self.total = len(pending)
+        self.skipped = len(files) - len(pending)
+        self.processed = 0
+        self.errors = []
+        print(f"Found {len(files)} images, {self.skipped} already done, {self.total} to process.")
+
+        read_queue = queue.Queue(self.read_ahead)
+        write_queue = queue.Queue()
+        in_flight = threading.Semaphore(self.read_ahead)
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read, args=(pending, read_queue, stop), daemon=True)
+        writer = threading.Thread(target=self._write, args=(write_queue, in_flight), daemon=True)
+        # Spawned rather than forked, as on Windows, so workers never inherit the reader and writer threads
+        pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(self.settings,))
+
+        self.started_at = self.last_report = time.perf_counter()
+        reader.start()
+        writer.start()
+        finished = False
+        try:
+            while True:
+                item = read_queue.get()
+                if item is None:
+                    finished = True
+                    break
+                file, image, error = item
+                in_flight.acquire()
+                if error is not None:
+                    write_queue.put((file, None, error))
+                else:
+                    future = pool.submit(_process_image, file, image)
+                    future.add_done_callback(lambda future, file=file: write_queue.put((file, future, None)))
+        finally:
+            # On an interrupt, images already being processed are still written and recorded
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=not finished)
+            write_queue.put(None)
+            writer.join()
+
+        summary = self.summary()
+        print(f"Processed {summary['processed']} images in {summary['seconds']:.1f}s "
+              f"({summary['images_per_second']:.1f} images/s), {len(self.errors)} errors, {self.skipped} skipped.")
+        return summary
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at is not None else 0.0
+        return {
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "errors": list(self.errors),
+            "seconds": elapsed,
+            "images_per_second": self.processed / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def _read(self, files, read_queue, stop):
+        for file in files:
+            if stop.is_set():
+                return
+            try:
+                item = (file, self.read_image(os.path.join(self.input_dir, file)), None)
+            except (OSError, ValueError, cv2.error) as e:
+                item = (file, None, e)
+            # Waits while the read-ahead queue is full, but gives up once the run is stopping
+            while not stop.is_set():
+                try:
+                    read_queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+        read_queue.put(None)
+
+    def _write(self, write_queue, in_flight):
+        with open(self.manifest_path(), 'a') as manifest:
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    break
+                file, future, error = item
+                try:
+                    if future is not None and future.cancelled():
+                        continue  # Never started because the run was interrupted
+                    if future is not None:
+                        try:
+                            path = os.path.join(self.output_dir, file)
+                            os.makedirs(os.path.dirname(path), exist_ok=True)
+                            future.result().tofile(path)
+                        except Exception as e:
+                            # One bad file must not end a run over thousands of them
+                            error = e
+                    self._record(manifest, file, error)
+                finally:
+                    in_flight.release()
+
+    def _record(self, manifest, file, error):
+        if error is None:
+            self.processed += 1
+            entry = {"file": file, "status": "done"}
+        else:
+            print(f"Error: Could not process {file}: {error}")
+            self.errors.append((file, str(error)))
+            entry = {"file": file, "status": "error", "error": str(error)}
+        manifest.write(json.dumps(entry) + "\n")
+        manifest.flush()  # Keeps the manifest current if the run is killed
+
+        now = time.perf_counter()
+        if now - self.last_report >= self.report_interval:
+            self.last_report = now
+            finished = self.processed + len(self.errors)
+            print(f"{finished}/{self.total} images, {self.processed / (now - self.started_at):.1f} images/s, "
+                  f"{len(self.errors)} errors")
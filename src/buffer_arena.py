@@ -0,0 +1,58 @@
+import numpy as np
+
+class BufferArena:
+    """Hands out preallocated arrays keyed by name, shape and dtype so they can be reused across frames.
+
+    Buffers that go unused for more than max_idle_frames frames are dropped at the end of a frame, so a change of
+    resolution or proxy scale doesn't keep the old set around for the rest of the session.
+    """
+
+    def __init__(self, max_idle_frames=30):
+        self.buffers = {}
+        self.last_used = {}  # Frame number each buffer was last handed out in
+        self.frame = 0
+        self.max_idle_frames = max_idle_frames
+        self.allocations = 0  # Total buffers allocated since creation
+        self.frame_allocations = 0  # Buffers allocated during the current frame
+        self.last_frame_allocations = 0  # Buffers allocated during the last finished frame
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Returns the buffer for name with the given shape and dtype, allocating it on first use.
+
+        The contents are whatever the previous user left behind, so callers must overwrite the whole buffer.
+        """
+        key = (name, tuple(shape), np.dtype(dtype))
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[key] = buffer
+            self.allocations += 1
+            self.frame_allocations += 1
+        self.last_used[key] = self.frame
+        return buffer
+
+    def like(self, name, array, dtype=None):
+        """Returns a buffer with the shape of array and its dtype unless another is given."""
+        return self.get(name, array.shape, array.dtype if dtype is None else dtype)
+
+    def begin_frame(self):
+        """Marks the start of a new frame for the per-frame allocation counter and the idle tracking."""
+        self.frame += 1
+        self.frame_allocations = 0
+
+    def end_frame(self):
+        """Publishes the number of buffers allocated since begin_frame and drops buffers that have gone idle."""
+        self.last_frame_allocations = self.frame_allocations
+        idle = [key for key, used in self.last_used.items() if self.frame - used > self.max_idle_frames]
+        for key in idle:
+            del self.buffers[key]
+            del self.last_used[key]
+
+    def nbytes(self):
+        # Read from the metrics threads while workers add buffers, so iterate over a copy
+        return sum(buffer.nbytes for buffer in list(self.buffers.values()))
+
+    def clear(self):
+        """Drops every buffer at once."""
+        self.buffers.clear()
+        self.last_used.clear()
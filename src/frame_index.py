@@ -0,0 +1,105 @@
+import bisect
+import json
+import os
+import cv2
+
+class FrameIndex:
+    """Keyframe positions of a video file, stored next to the file and reused on later opens."""
+
+    version = 2
+    # Seek points used when the backend can't report keyframes (seeks are then left to OpenCV)
+    fallback_interval = 30
+
+    def __init__(self, video_path, frame_count, keyframes, exact=True):
+        self.video_path = video_path
+        self.frame_count = frame_count
+        self.keyframes = keyframes  # Frame numbers, ascending, always starting at 0
+        self.exact = exact  # False if the keyframes are only evenly spaced seek points
+
+    @staticmethod
+    def index_path(video_path):
+        return video_path + ".lvndrindex.json"
+
+    @staticmethod
+    def _file_signature(video_path):
+        stat = os.stat(video_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    @classmethod
+    def load_or_build(cls, video_path):
+        """Loads the stored index if it still matches the file, otherwise builds and stores a new one."""
+        index = cls.load(video_path)
+        if index is None:
+            index = cls.build(video_path)
+            if index is not None:
+                index.save()
+        return index
+
+    @classmethod
+    def load(cls, video_path):
+        try:
+            with open(cls.index_path(video_path), 'r') as f:
+                data = json.load(f)
+            if data.get("version") != cls.version or data.get("file") != cls._file_signature(video_path):
+                return None
+            return cls(video_path, data["frame_count"], data["keyframes"], data["exact"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self):
+        data = {
+            "version": self.version,
+            "file": self._file_signature(self.video_path),
+            "frame_count": self.frame_count,
+            "keyframes": self.keyframes,
+            "exact": self.exact,
+        }
+        try:
+            with open(self.index_path(self.video_path), 'w') as f:
+                json.dump(data, f)
+        except OSError as e:
+            print(f"Warning: Could not save frame index: {e}")
+
+    @classmethod
+    def build(cls, video_path):
+        """Reads every packet of the file once, without decoding, and records where the keyframes are."""
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            return None
+        # Raw mode hands out the encoded packets, which is enough to tell keyframes apart and much cheaper than decoding
+        exact = capture.set(cv2.CAP_PROP_FORMAT, -1)
+        keyframes = []
+        frame_count = 0
+        while capture.grab():
+            if exact:
+                is_keyframe = capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME) != 0
+            else:
+                is_keyframe = frame_count % cls.fallback_interval == 0
+            if is_keyframe or frame_count == 0:
+                keyframes.append(frame_count)
+            frame_count += 1
+        capture.release()
+
+        if frame_count == 0:
+            return None
+        return cls(video_path, frame_count, keyframes, exact)
+
+    def keyframe_before(self, frame):
+        """Returns the last keyframe at or before the given frame."""
+        return self.keyframes[max(0, bisect.bisect_right(self.keyframes, frame) - 1)]
+
+    def seek(self, capture, frame, position=None):
+        """Positions the capture so that the next read returns the given frame.
+
+        position is the frame the capture would read next. When no keyframe lies between it and the target, the
+        frames in between are grabbed instead of seeking, since a seek would go back to the same keyframe and decode
+        them again. Other jumps use OpenCV's own seek, which already starts from the keyframe before the target.
+        """
+        frame = max(0, min(frame, self.frame_count - 1))
+        if self.exact and position is not None and position <= frame and self.keyframe_before(frame) <= position:
+            for _ in range(frame - position):
+                if not capture.grab():
+                    break
+        else:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        return frame
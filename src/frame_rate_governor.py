@@ -0,0 +1,147 @@
+class FrameRateGovernor:
+    """Steps expensive processor settings down when frames run over budget and restores them when there is headroom."""
+
+    # Quality steps for each knob, ordered from full quality to cheapest
+    knob_steps = {
+        "blur": ["gaussian", "box"],
+        "repeat": [None, 3, 2, 1],
+        "proxy_scale": [1.0, 0.75, 0.5, 0.35],
+    }
+
+    def __init__(self, processor, target_fps=30.0, priority=("blur", "repeat", "proxy_scale")):
+        self.processor = processor
+        self.enabled = False
+        self.target_fps = target_fps
+
+        # Hysteresis: degrade above the budget, restore only well below it
+        self.degrade_margin = 1.0
+        self.restore_margin = 0.75
+        self.degrade_frames = 5
+        self.restore_frames = 30
+        self.smoothing = 0.2
+
+        # Restore backoff: a restore that is undone within restore_undo_frames doubles the wait before that level is
+        # tried again (up to max_restore_frames), so a rung that sits right at the budget doesn't flicker
+        self.restore_undo_frames = 60
+        self.max_restore_frames = 1920
+        self.restore_waits = {}  # Frames to wait before restoring to a level, for levels whose restore failed
+        self.restored_level = None
+        self.restored_at = 0
+
+        self.level = 0
+        self.frames = 0
+        self.frame_time = None
+        self.over_budget_count = 0
+        self.under_budget_count = 0
+        self.set_priority(priority)
+
+    def set_priority(self, priority):
+        """Builds the degradation ladder from the knob priority order (first knob is degraded first)."""
+        for knob in priority:
+            if knob not in self.knob_steps:
+                raise ValueError(f"Unknown governor knob: {knob}")
+        self.priority = tuple(priority)
+        # Each rung of the ladder moves one knob down by one step
+        self.ladder = [(knob, step) for knob in self.priority for step in range(1, len(self.knob_steps[knob]))]
+        self.level = min(self.level, len(self.ladder))
+        self.apply_level()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if not enabled:
+            self.reset()
+
+    def set_target_fps(self, target_fps):
+        self.target_fps = max(1.0, float(target_fps))
+        self._reset_measurement()
+        self._reset_backoff()  # Failed restores say nothing about the new budget
+
+    def reset(self):
+        """Restores full quality and clears the frame time history."""
+        self.level = 0
+        self._reset_measurement()
+        self._reset_backoff()
+        self.apply_level()
+
+    def _reset_backoff(self):
+        self.restore_waits = {}
+        self.restored_level = None
+
+    def _reset_measurement(self):
+        self.frame_time = None
+        self.over_budget_count = 0
+        self.under_budget_count = 0
+
+    def update(self, frame_time):
+        """Records the processing time of one frame (in seconds) and adjusts the degradation level."""
+        if not self.enabled:
+            return
+
+        self.frames += 1
+        if self.restored_level is not None and self.frames - self.restored_at > self.restore_undo_frames:
+            # The last restore held, so that level gets the normal wait again
+            self.restore_waits.pop(self.restored_level, None)
+            self.restored_level = None
+
+        if self.frame_time is None:
+            self.frame_time = frame_time
+        else:
+            self.frame_time += self.smoothing * (frame_time - self.frame_time)
+
+        budget = 1.0 / self.target_fps
+        if self.frame_time > budget * self.degrade_margin:
+            self.over_budget_count += 1
+            self.under_budget_count = 0
+        elif self.frame_time < budget * self.restore_margin:
+            self.under_budget_count += 1
+            self.over_budget_count = 0
+        else:
+            self.over_budget_count = 0
+            self.under_budget_count = 0
+
+        if self.over_budget_count >= self.degrade_frames and self.level < len(self.ladder):
+            if self.restored_level == self.level:
+                # The restore to this level didn't hold, so wait longer before trying it again
+                wait = self.restore_waits.get(self.level, self.restore_frames)
+                self.restore_waits[self.level] = min(wait * 2, self.max_restore_frames)
+                self.restored_level = None
+            self.level += 1
+            self._reset_measurement()
+            self.apply_level()
+        elif self.level > 0 and self.under_budget_count >= self.restore_waits.get(self.level - 1, self.restore_frames):
+            self.level -= 1
+            self.restored_level = self.level
+            self.restored_at = self.frames
+            self._reset_measurement()
+            self.apply_level()
+
+    def current_steps(self):
+        """Returns the step index of every knob at the current level."""
+        steps = {knob: 0 for knob in self.knob_steps}
+        for knob, step in self.ladder[:self.level]:
+            steps[knob] = max(steps[knob], step)
+        return steps
+
+    def apply_level(self):
+        """Pushes the knob values for the current level onto the processor."""
+        steps = self.current_steps()
+        self.processor.blur_backend = self.knob_steps["blur"][steps["blur"]]
+        self.processor.max_repeat = self.knob_steps["repeat"][steps["repeat"]]
+        self.processor.proxy_scale = self.knob_steps["proxy_scale"][steps["proxy_scale"]]
+
+    def describe(self):
+        """Returns a short human readable summary of the current degradation level."""
+        if not self.enabled:
+            return "Governor: off"
+        if self.level == 0:
+            return f"Governor: full quality (0/{len(self.ladder)})"
+
+        steps = self.current_steps()
+        changes = []
+        if steps["blur"]:
+            changes.append(f"blur={self.processor.blur_backend}")
+        if steps["repeat"]:
+            changes.append(f"repeat<={self.processor.max_repeat}")
+        if steps["proxy_scale"]:
+            changes.append(f"scale={self.processor.proxy_scale:.2f}")
+        return f"Governor: level {self.level}/{len(self.ladder)} ({', '.join(changes)})"
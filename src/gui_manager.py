@@ -1,7 +1,8 @@
 import json
 import re
 import os
-from PyQt5 import QtWidgets, QtCore
+from PyQt5 import QtWidgets, QtCore, QtGui
+from src.preset_bank import BankedPreset, PresetBank
 
 def sanitize_filename(filename):
     # Define the pattern for invalid characters (Windows reserved characters for file names)
@@ -52,13 +53,19 @@ class FloatSlider(QtWidgets.QWidget):
 
 
 class MainWindow(QtWidgets.QMainWindow):
+    # Keys pressed in the video windows arrive on a capture thread and are handled on the GUI thread
+    video_key_pressed = QtCore.pyqtSignal(str)
+
     def __init__(self, processor, video_manager):
         super().__init__()
         self.processor = processor
         self.video_manager = video_manager
         self.sliders = {}
         self.channel_checkboxes = []
+        self.preset_bank = PresetBank().load()
         self.init_ui()
+        self.video_key_pressed.connect(self.handle_video_key)
+        self.video_manager.on_key = self.video_key_pressed.emit
         self.apply_lvn_to_base_checkbox.stateChanged.connect(self.update_apply_lvn_to_base)
         self.apply_lvn_to_blend_checkbox.stateChanged.connect(self.update_apply_lvn_to_blend)
         self.apply_wordpad_glitch_to_base_checkbox.stateChanged.connect(self.update_apply_wordpad_glitch_to_base)
@@ -70,7 +77,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setMinimumSize(500, 900)
         central_widget = QtWidgets.QWidget()
         self.setCentralWidget(central_widget)
-        self.load_stylesheet(".\\src\\style.css")
+        self.load_stylesheet(os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css"))
         central_widget.setStyleSheet("background-color: #000;")
 
         scroll_area = QtWidgets.QScrollArea()
@@ -79,11 +86,16 @@ class MainWindow(QtWidgets.QMainWindow):
         self.layout = QtWidgets.QVBoxLayout()
 
         self.create_button_layout()
+        self.create_source_widget()
+        self.create_playback_widget()
         self.create_preset_widget()
         self.add_widgets_to_layout(self.layout)
         self.create_color_space_dropdown()
         self.create_blending_mode_dropdown()
+        self.create_wordpad_source_dropdown()
+        self.create_lvn_backend_dropdown()
         self.create_checkbox_layout()
+        self.create_governor_widget()
 
         central_widget.setLayout(self.layout)
         scroll_area.setWidget(central_widget)
@@ -117,7 +129,86 @@ class MainWindow(QtWidgets.QMainWindow):
         button_layout.addWidget(self.reset_button)
 
         self.layout.addLayout(button_layout)
+
+    def create_source_widget(self):
+        source_layout = QtWidgets.QHBoxLayout()
+
+        self.add_webcam_button = QtWidgets.QPushButton("Add Webcam")
+        self.add_webcam_button.clicked.connect(self.add_webcam_source)
+        source_layout.addWidget(self.add_webcam_button)
+
+        self.add_video_button = QtWidgets.QPushButton("Add Video")
+        self.add_video_button.clicked.connect(self.add_video_source)
+        source_layout.addWidget(self.add_video_button)
+
+        # Source whose frames are blended into the main feed
+        self.blend_source_dropdown = QtWidgets.QComboBox()
+        self.blend_source_dropdown.addItem("Blend: Self", None)
+        self.blend_source_dropdown.setFixedHeight(30)
+        self.blend_source_dropdown.currentIndexChanged.connect(self.update_blend_source)
+        source_layout.addWidget(self.blend_source_dropdown)
+
+        self.layout.addLayout(source_layout)
     
+    def create_playback_widget(self):
+        # Scrub bar for video files; seeks go through the file's keyframe index
+        self.scrub_slider = QtWidgets.QSlider(QtCore.Qt.Horizontal)
+        self.scrub_slider.setRange(0, 0)
+        self.scrub_slider.setEnabled(False)
+        self.scrub_slider.valueChanged.connect(self.video_manager.seek)
+        self.layout.addWidget(self.scrub_slider)
+
+        playback_layout = QtWidgets.QHBoxLayout()
+        self.playback_label = QtWidgets.QLabel("No video file")
+        playback_layout.addWidget(self.playback_label)
+
+        self.set_loop_in_button = QtWidgets.QPushButton("Set In")
+        self.set_loop_in_button.clicked.connect(self.set_loop_in)
+        playback_layout.addWidget(self.set_loop_in_button)
+
+        self.set_loop_out_button = QtWidgets.QPushButton("Set Out")
+        self.set_loop_out_button.clicked.connect(self.set_loop_out)
+        playback_layout.addWidget(self.set_loop_out_button)
+
+        self.clear_loop_button = QtWidgets.QPushButton("Clear Loop")
+        self.clear_loop_button.clicked.connect(lambda: self.video_manager.set_loop_points(None, None))
+        playback_layout.addWidget(self.clear_loop_button)
+
+        self.layout.addLayout(playback_layout)
+
+    def set_loop_in(self):
+        state = self.video_manager.playback_state()
+        if state is not None:
+            position, _, _, loop_out = state
+            self.video_manager.set_loop_points(position, loop_out)
+
+    def set_loop_out(self):
+        state = self.video_manager.playback_state()
+        if state is not None:
+            position, _, loop_in, _ = state
+            self.video_manager.set_loop_points(loop_in, position)
+
+    def update_playback_widget(self):
+        state = self.video_manager.playback_state()
+        if state is None:
+            self.scrub_slider.setEnabled(False)
+            self.playback_label.setText("No video file")
+            return
+
+        position, frame_count, loop_in, loop_out = state
+        self.scrub_slider.setEnabled(True)
+        # Don't fight the user while they drag, and don't turn our own updates into seeks
+        if not self.scrub_slider.isSliderDown():
+            self.scrub_slider.blockSignals(True)
+            self.scrub_slider.setRange(0, max(0, frame_count - 1))
+            self.scrub_slider.setValue(position)
+            self.scrub_slider.blockSignals(False)
+
+        text = f"Frame {position} / {frame_count}"
+        if loop_in is not None or loop_out is not None:
+            text += f" | Loop {loop_in if loop_in is not None else 0}-{loop_out if loop_out is not None else frame_count - 1}"
+        self.playback_label.setText(text)
+
     def create_preset_widget(self):
         self.preset_layout = QtWidgets.QHBoxLayout()
         
@@ -175,6 +266,16 @@ class MainWindow(QtWidgets.QMainWindow):
         self.blending_mode_dropdown = self.create_dropdown("Blending Mode", ["None", "Overlay", "Multiply", "Linear Burn", "Screen", "Darken", "Lighten", "Difference", "Exclusion", "Soft Light", "Hard Light", "Dodge", "Burn"])
         self.layout.addWidget(self.blending_mode_dropdown)
 
+    def create_wordpad_source_dropdown(self):
+        # BMP glitches the raw pixels, JPEG glitches the much smaller compressed stream
+        self.wordpad_source_dropdown = self.create_dropdown("Wordpad Source", ["BMP", "JPEG"])
+        self.layout.addWidget(self.wordpad_source_dropdown)
+
+    def create_lvn_backend_dropdown(self):
+        # Numba runs fused LVN kernels when it is installed, otherwise the processor falls back to OpenCV
+        self.lvn_backend_dropdown = self.create_dropdown("LVN Backend", ["OpenCV", "Numba"])
+        self.layout.addWidget(self.lvn_backend_dropdown)
+
     def create_checkbox_layout(self):
         # LVN Filter Checkboxes
         self.apply_lvn_to_base_checkbox = QtWidgets.QCheckBox("Apply LVN to Base")
@@ -194,6 +295,50 @@ class MainWindow(QtWidgets.QMainWindow):
         self.layout.addWidget(self.apply_wordpad_glitch_to_base_checkbox)
         self.layout.addWidget(self.apply_wordpad_glitch_to_blend_checkbox)
 
+    def create_governor_widget(self):
+        governor = self.video_manager.governor
+        governor_layout = QtWidgets.QHBoxLayout()
+
+        self.governor_checkbox = QtWidgets.QCheckBox("Adaptive Frame Rate")
+        self.governor_checkbox.setChecked(governor.enabled)
+        self.governor_checkbox.stateChanged.connect(self.update_governor_enabled)
+        governor_layout.addWidget(self.governor_checkbox)
+
+        self.target_fps_spinbox = QtWidgets.QSpinBox()
+        self.target_fps_spinbox.setRange(1, 240)
+        self.target_fps_spinbox.setValue(int(governor.target_fps))
+        self.target_fps_spinbox.setSuffix(" FPS")
+        self.target_fps_spinbox.valueChanged.connect(governor.set_target_fps)
+        governor_layout.addWidget(self.target_fps_spinbox)
+
+        self.layout.addLayout(governor_layout)
+
+        # Current degradation level and throughput, refreshed periodically from the live loop
+        self.governor_label = QtWidgets.QLabel(governor.describe())
+        self.layout.addWidget(self.governor_label)
+        self.throughput_label = QtWidgets.QLabel()
+        self.layout.addWidget(self.throughput_label)
+
+        self.status_timer = QtCore.QTimer(self)
+        self.status_timer.timeout.connect(self.update_status_labels)
+        self.status_timer.start(200)
+
+    def update_governor_enabled(self, state):
+        self.video_manager.governor.set_enabled(state == QtCore.Qt.Checked)
+        self.update_status_labels()
+
+    def update_status_labels(self):
+        self.governor_label.setText(self.video_manager.governor.describe())
+        self.update_playback_widget()
+
+        rates = self.video_manager.throughput()
+        total = rates.pop("total")
+        streams = ", ".join(f"#{source_id}: {fps:.1f}" for source_id, fps in rates.items())
+        self.throughput_label.setText(
+            f"Throughput: {total:.1f} FPS" + (f" ({streams})" if len(rates) > 1 else "")
+            + f" | Allocations/frame: {self.processor.arena.last_frame_allocations}"
+        )
+
 
     def create_preset_widget(self):
         self.preset_layout = QtWidgets.QHBoxLayout()
@@ -215,6 +360,87 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.layout.addLayout(self.preset_layout)
 
+        # Presets loaded at startup, switched from here or with the number keys (Ctrl+1-9 in this window)
+        bank_layout = QtWidgets.QHBoxLayout()
+        self.preset_bank_dropdown = QtWidgets.QComboBox()
+        self.preset_bank_dropdown.setFixedHeight(30)
+        self.preset_bank_dropdown.activated.connect(self.switch_preset)
+        bank_layout.addWidget(self.preset_bank_dropdown)
+
+        self.crossfade_spinbox = QtWidgets.QSpinBox()
+        self.crossfade_spinbox.setRange(0, 120)
+        self.crossfade_spinbox.setPrefix("Crossfade: ")
+        self.crossfade_spinbox.setSuffix(" frames")
+        bank_layout.addWidget(self.crossfade_spinbox)
+
+        self.layout.addLayout(bank_layout)
+        self.update_preset_bank_dropdown()
+
+        for number in range(1, 10):
+            shortcut = QtWidgets.QShortcut(QtGui.QKeySequence(f"Ctrl+{number}"), self)
+            shortcut.activated.connect(lambda index=number - 1: self.switch_preset(index))
+
+    def update_preset_bank_dropdown(self):
+        self.preset_bank_dropdown.clear()
+        self.preset_bank_dropdown.addItems([f"{i + 1}. {name}" for i, name in enumerate(self.preset_bank.names())])
+
+    def handle_video_key(self, key):
+        if key in "123456789":
+            self.switch_preset(int(key) - 1)
+
+    def switch_preset(self, index):
+        preset = self.preset_bank.get(index)
+        if preset is not None:
+            self.preset_bank_dropdown.setCurrentIndex(index)
+            self.activate_preset(preset)
+
+    def activate_preset(self, preset):
+        """Swaps the whole preset in at the next frame boundary, then updates the controls to match."""
+        if self.video_manager.source_ids():
+            self.processor.queue_settings(preset.settings, preset.lvn_kernels, self.crossfade_spinbox.value())
+        else:
+            self.processor.apply_settings(preset.settings, preset.lvn_kernels)
+        self.show_preset(preset.preset)
+
+    def show_preset(self, preset):
+        """Sets the controls to a preset without writing each value to the processor on its own."""
+        widgets = [self.color_space_dropdown, self.blending_mode_dropdown, self.wordpad_source_dropdown,
+                   self.lvn_backend_dropdown, self.apply_lvn_to_base_checkbox, self.apply_lvn_to_blend_checkbox,
+                   self.apply_wordpad_glitch_to_base_checkbox, self.apply_wordpad_glitch_to_blend_checkbox]
+        for slider in self.sliders.values():
+            widgets += [slider.spinbox, slider.slider]
+        for widget in widgets:
+            widget.blockSignals(True)
+
+        for label, value in preset.items():
+            if label in self.sliders:
+                self.sliders[label].set_value(value)
+
+        color_space = self.color_space_dropdown.currentText()
+        for key, dropdown in (('color_space', self.color_space_dropdown), ('blending_mode', self.blending_mode_dropdown),
+                              ('wordpad_source', self.wordpad_source_dropdown), ('lvn_backend', self.lvn_backend_dropdown)):
+            if key in preset:
+                index = dropdown.findText(preset[key])
+                if index != -1:
+                    dropdown.setCurrentIndex(index)
+
+        for key in ('apply_lvn_to_base', 'apply_lvn_to_blend', 'apply_wordpad_glitch_to_base', 'apply_wordpad_glitch_to_blend'):
+            if key in preset:
+                getattr(self, f"{key}_checkbox").setChecked(preset[key])
+
+        for widget in widgets:
+            widget.blockSignals(False)
+
+        # The channel checkboxes depend on the colour space and are rebuilt when it changes
+        if self.color_space_dropdown.currentText() != color_space:
+            self.update_channel_checkboxes()
+        if 'selected_channels' in preset:
+            for i, checked in enumerate(preset['selected_channels']):
+                if i < len(self.channel_checkboxes):
+                    self.channel_checkboxes[i].blockSignals(True)
+                    self.channel_checkboxes[i].setChecked(checked)
+                    self.channel_checkboxes[i].blockSignals(False)
+
     def create_float_slider(self, label, min_value, max_value, default_value, step=0.1):
         float_slider = FloatSlider(label, min_value, max_value, default_value, step)
         
@@ -302,6 +528,10 @@ class MainWindow(QtWidgets.QMainWindow):
         elif label == "Blending Mode":
             self.processor.selected_blending_mode = value
             self.processor.apply_blending = value != "None"
+        elif label == "Wordpad Source":
+            self.processor.wordpad_source = value
+        elif label == "LVN Backend":
+            self.processor.lvn_backend = value
 
     def update_apply_lvn_to_base(self, state):
         self.processor.apply_lvn_to_base = (state == QtCore.Qt.Checked)
@@ -317,9 +547,37 @@ class MainWindow(QtWidgets.QMainWindow):
 
 
     def start_webcam(self):
+        self.reset_blend_sources()
         self.video_manager.start_webcam()
 
+    def reset_blend_sources(self):
+        """Starting a new main source closes every other source, so their blend options go too."""
+        self.blend_source_dropdown.blockSignals(True)
+        while self.blend_source_dropdown.count() > 1:
+            self.blend_source_dropdown.removeItem(1)
+        self.blend_source_dropdown.setCurrentIndex(0)
+        self.blend_source_dropdown.blockSignals(False)
+
+    def add_webcam_source(self):
+        index, ok = QtWidgets.QInputDialog.getInt(self, "Add Webcam", "Camera index:", 1, 0, 16)
+        if ok:
+            self.add_blend_source_option(self.video_manager.add_webcam(index), f"Webcam {index}")
+
+    def add_video_source(self):
+        file_path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Add Video File", "", "Video Files (*.mp4 *.avi *.mov)")
+        if file_path:
+            self.add_blend_source_option(self.video_manager.add_video_file(file_path), os.path.basename(file_path))
+
+    def add_blend_source_option(self, source_id, name):
+        if source_id is not None:
+            self.blend_source_dropdown.addItem(f"Blend: #{source_id} {name}", source_id)
+
+    def update_blend_source(self, index):
+        if self.video_manager.primary_id is not None:
+            self.video_manager.set_blend_source(self.video_manager.primary_id, self.blend_source_dropdown.itemData(index))
+
     def stop_webcam(self):
+        self.reset_blend_sources()
         self.video_manager.close()  # Stop the webcam and release resources
 
     def open_video(self):
@@ -367,6 +625,8 @@ class MainWindow(QtWidgets.QMainWindow):
         # Save checkbox states
         preset['color_space'] = self.color_space_dropdown.currentText()
         preset['blending_mode'] = self.blending_mode_dropdown.currentText()
+        preset['wordpad_source'] = self.wordpad_source_dropdown.currentText()
+        preset['lvn_backend'] = self.lvn_backend_dropdown.currentText()
         preset['selected_channels'] = [cb.isChecked() for cb in self.channel_checkboxes]
 
         # Save the new LVN and Wordpad glitch checkboxes
@@ -383,6 +643,10 @@ class MainWindow(QtWidgets.QMainWindow):
 
         with open(os.path.join(presets_dir, f"{sanitized_preset_name}.json"), 'w') as f:
             json.dump(preset, f)
+
+        # Make the new preset available in the bank right away
+        self.preset_bank.load()
+        self.update_preset_bank_dropdown()
             
     def load_preset(self):
         preset_path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Load Preset", "presets", "Preset Files (*.json)")
@@ -397,39 +661,8 @@ class MainWindow(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.warning(self, "Error", f"Failed to load preset: {str(e)}")
             return
 
-        # Apply the preset values to the sliders
-        for label, value in preset.items():
-            if label in self.sliders:
-                self.sliders[label].set_value(value)
-
-        # Apply additional control states
-        if 'color_space' in preset:
-            index = self.color_space_dropdown.findText(preset['color_space'])
-            if index != -1:
-                self.color_space_dropdown.setCurrentIndex(index)
-
-        if 'blending_mode' in preset:
-            index = self.blending_mode_dropdown.findText(preset['blending_mode'])
-            if index != -1:
-                self.blending_mode_dropdown.setCurrentIndex(index)
-
-        if 'selected_channels' in preset:
-            for i, checked in enumerate(preset['selected_channels']):
-                if i < len(self.channel_checkboxes):
-                    self.channel_checkboxes[i].setChecked(checked)
-
-        # Restore LVN and Wordpad glitch checkboxes
-        if 'apply_lvn_to_base' in preset:
-            self.apply_lvn_to_base_checkbox.setChecked(preset['apply_lvn_to_base'])
-
-        if 'apply_lvn_to_blend' in preset:
-            self.apply_lvn_to_blend_checkbox.setChecked(preset['apply_lvn_to_blend'])
-
-        if 'apply_wordpad_glitch_to_base' in preset:
-            self.apply_wordpad_glitch_to_base_checkbox.setChecked(preset['apply_wordpad_glitch_to_base'])
-
-        if 'apply_wordpad_glitch_to_blend' in preset:
-            self.apply_wordpad_glitch_to_blend_checkbox.setChecked(preset['apply_wordpad_glitch_to_blend'])
+        # Switch everything at once instead of slider by slider
+        self.activate_preset(BankedPreset(os.path.splitext(os.path.basename(preset_path))[0], preset))
 
 
 
@@ -2,7 +2,9 @@ import cv2
 import numpy as np
 import re
 import functools
-import io
+import copy
+import threading
+from src.buffer_arena import BufferArena
 
 class ImageProcessor:
     def __init__(self):
@@ -20,6 +22,8 @@ class ImageProcessor:
         self.default_color_space = "RGB" 
         self.default_blending_mode = "None" 
         self.default_selected_channels = [1, 1, 1] 
+        self.default_wordpad_source = "BMP"  # Byte stream the Wordpad glitch edits: "BMP" or "JPEG"
+        self.default_lvn_backend = "OpenCV"  # "OpenCV" or the fused "Numba" kernels when Numba is installed
 
         # Defaults for brightness, contrast, and saturation
         self.default_brightness = 1.0  # Brightness multiplier (1.0 = no change)
@@ -46,12 +50,37 @@ class ImageProcessor:
         self.selected_color_space = self.default_color_space
         self.selected_blending_mode = self.default_blending_mode
         self.selected_channels = [1, 1, 1]
+        self.wordpad_source = self.default_wordpad_source
+        self.lvn_backend = self.default_lvn_backend
+        self._lvn_kernels = {}  # 1-D Gaussian kernels by kernel size, for the Numba backend
+
+        # Settings queued by queue_settings, applied at the start of the next frame
+        self._settings_lock = threading.Lock()
+        self._pending_settings = None
+        # Processor with the outgoing settings while crossfading to new ones. It is created on the first crossfade,
+        # kept for later ones and shares this processor's buffer arena, so a crossfade allocates nothing
+        self._fade_processor = None
+        self._fade_from = None
+        self._fade_frames = 0
+        self._fade_remaining = 0
 
         # Current values for brightness, contrast, and saturation
         self.brightness = self.default_brightness
         self.contrast = self.default_contrast
         self.saturation = self.default_saturation
 
+        # Runtime quality overrides, driven by the frame-rate governor
+        self.proxy_scale = 1.0  # Process at a fraction of the input resolution
+        self.max_repeat = None  # Upper bound on LVN repeats (None = no limit)
+        self.blur_backend = "gaussian"  # "gaussian" or the cheaper "box"
+
+        # Last external blend layer and its resized copy, so it is only resized once per source frame
+        self._blend_layer_cache = None
+
+        # Reused per-frame buffers, and the BMP header for each frame shape
+        self.arena = BufferArena()
+        self._bmp_headers = {}
+
         # Color space conversion mappings
         self.color_space_conversion = {
             "RGB": None,
@@ -71,8 +100,113 @@ class ImageProcessor:
             (b'(\x0A)(?<!\x0D)', b'\x0A\x0D')
         ]
 
-        self.wordpad_glitch = [(re.compile(sub), replacement) for (sub, replacement) in self.wordpad_glitch_replacements]
-        self.wordpad_replacer = functools.partial(self.replace, replacements=self.wordpad_glitch)
+    # Preset keys as saved by the GUI and the processor attributes they set
+    preset_attributes = {
+        "Amplitude": "amplitude",
+        "Smoothness": "smoothness",
+        "Threshold": "threshold",
+        "Repeat": "repeat",
+        "JPEG Quality": "jpeg_quality",
+        "Blend JPEG Quality": "blend_jpeg_quality",
+        "Brightness": "brightness",
+        "Saturation": "saturation",
+        "Contrast": "contrast",
+        "Base Weight": "base_weight",
+        "Blend Weight": "blend_weight",
+        "color_space": "selected_color_space",
+        "blending_mode": "selected_blending_mode",
+        "apply_lvn_to_base": "apply_lvn_to_base",
+        "apply_lvn_to_blend": "apply_lvn_to_blend",
+        "apply_wordpad_glitch_to_base": "apply_wordpad_glitch_to_base",
+        "apply_wordpad_glitch_to_blend": "apply_wordpad_glitch_to_blend",
+        "wordpad_source": "wordpad_source",
+        "lvn_backend": "lvn_backend",
+    }
+
+    # Any marker other than byte stuffing (FF 00) or a restart marker (FF D0-D7) ends the entropy-coded data
+    jpeg_scan_end = re.compile(b'\xff[^\x00\xd0-\xd7]')
+
+    # Upper bound on the size of the stack that process_batch runs through the per-pixel stages at once
+    batch_chunk_bytes = 4 * 1024 * 1024
+
+    # The Wordpad patterns are compiled on first use so that creating a processor stays cheap
+    @functools.cached_property
+    def wordpad_glitch(self):
+        return [(re.compile(sub), replacement) for (sub, replacement) in self.wordpad_glitch_replacements]
+
+    @functools.cached_property
+    def wordpad_replacer(self):
+        return functools.partial(self.replace, replacements=self.wordpad_glitch)
+
+    # Every attribute a preset can set
+    setting_attributes = tuple(preset_attributes.values()) + ("apply_blending", "selected_channels")
+
+    @classmethod
+    def preset_settings(cls, preset):
+        """Converts a preset dictionary as saved by the GUI into processor attribute values."""
+        settings = {attribute: preset[key] for key, attribute in cls.preset_attributes.items() if key in preset}
+        if "blending_mode" in preset:
+            settings["apply_blending"] = preset["blending_mode"] != "None"
+        if "selected_channels" in preset:
+            settings["selected_channels"] = [1 if checked else 0 for checked in preset["selected_channels"]]
+        return settings
+
+    @classmethod
+    def preset_from_settings(cls, settings):
+        """Converts processor attribute values back into a preset dictionary with the GUI's keys."""
+        preset = {key: settings[attribute] for key, attribute in cls.preset_attributes.items() if attribute in settings}
+        if "selected_channels" in settings:
+            preset["selected_channels"] = [channel != 0 for channel in settings["selected_channels"]]
+        return preset
+
+    @classmethod
+    def default_settings(cls):
+        return cls().current_settings()
+
+    def current_settings(self):
+        return {attribute: getattr(self, attribute) for attribute in self.setting_attributes}
+
+    def apply_preset(self, preset):
+        """Applies a preset dictionary as saved by the GUI."""
+        self.apply_settings(self.preset_settings(preset))
+
+    def apply_settings(self, settings, lvn_kernels=None):
+        """Sets processor attributes from a settings dictionary, plus any precomputed LVN kernels."""
+        for attribute, value in settings.items():
+            setattr(self, attribute, list(value) if isinstance(value, list) else value)
+        if lvn_kernels:
+            self._lvn_kernels.update(lvn_kernels)
+
+    def queue_settings(self, settings, lvn_kernels=None, crossfade_frames=0):
+        """Swaps in a whole set of settings between two frames, optionally crossfading over a number of frames.
+
+        Safe to call from another thread while frames are being processed; a newer call replaces a queued one.
+        """
+        with self._settings_lock:
+            self._pending_settings = (settings, lvn_kernels, int(crossfade_frames))
+
+    def _apply_pending_settings(self):
+        with self._settings_lock:
+            pending = self._pending_settings
+            self._pending_settings = None
+        if pending is None:
+            return
+        settings, lvn_kernels, crossfade_frames = pending
+        if crossfade_frames > 0:
+            # Keep rendering the outgoing settings on a second processor and fade it out over the next frames
+            fade_from = self._fade_processor
+            if fade_from is None:
+                fade_from = self._fade_processor = self.snapshot()
+                fade_from.arena = self.arena
+                fade_from._bmp_headers = self._bmp_headers
+            fade_from.apply_settings(self.current_settings(), self._lvn_kernels)
+            fade_from.proxy_scale = self.proxy_scale
+            fade_from.max_repeat = self.max_repeat
+            fade_from.blur_backend = self.blur_backend
+            self._fade_from = fade_from
+            self._fade_frames = crossfade_frames
+            self._fade_remaining = crossfade_frames
+        self.apply_settings(settings, lvn_kernels)
     
     def replace(self, img, replacements=()):
         """Replace byte patterns in the image based on provided replacements."""
@@ -82,25 +216,9 @@ class ImageProcessor:
     
     def apply_wordpad_glitch_to_image(self, img_data):
         """Apply the Wordpad glitch to the image byte stream."""
-        img = io.BytesIO(img_data)
-        img.seek(0)
-        header = img.read(16 + 24)  # Read header data
-        glitched = io.BytesIO(header + self.wordpad_replacer(img.read()))
-        return glitched.getvalue()
-    
-    def wordpad_glitch(self, frame):
-        """Main method to apply Wordpad glitch to a frame."""
-        # Convert frame to byte stream
-        frame_bytes = frame.tobytes()
-
-        # Apply the Wordpad glitch if the toggle is enabled
-        glitched_bytes = self.apply_wordpad_glitch_to_image(frame_bytes) if self.apply_wordpad_glitch else frame_bytes
-
-        # Convert the glitched byte stream back to an image
-        glitched_array = np.frombuffer(glitched_bytes, dtype=np.uint8)
-        glitched_image = cv2.imdecode(glitched_array, cv2.IMREAD_COLOR)
-
-        return glitched_image
+        img = memoryview(img_data)  # Slice without copying the stream
+        header = img[:16 + 24]  # Header data
+        return bytes(header) + self.wordpad_replacer(img[16 + 24:])
     
     def reset_to_defaults(self):
         """Reset all processing settings to their default values."""
@@ -116,14 +234,48 @@ class ImageProcessor:
         self.selected_color_space = self.default_color_space
         self.selected_blending_mode = self.default_blending_mode
         self.selected_channels = self.default_selected_channels
+        self.wordpad_source = self.default_wordpad_source
+        self.lvn_backend = self.default_lvn_backend
 
         # Reset brightness, contrast, and saturation
         self.brightness = self.default_brightness
         self.contrast = self.default_contrast
         self.saturation = self.default_saturation
 
+    def snapshot(self):
+        """Returns an independent copy of the current settings, e.g. for another input source."""
+        processor = copy.copy(self)
+        processor.selected_channels = list(self.selected_channels)
+        processor.proxy_scale = 1.0
+        processor.max_repeat = None
+        processor.blur_backend = "gaussian"
+        processor._blend_layer_cache = None
+        processor.arena = BufferArena()
+        processor._bmp_headers = {}
+        processor._lvn_kernels = dict(self._lvn_kernels)
+        processor._settings_lock = threading.Lock()
+        processor._pending_settings = None
+        processor._fade_processor = None
+        processor._fade_from = None
+        return processor
+
+    def fit_blend_layer(self, blend_layer, shape):
+        """Resizes an external blend layer to the given frame shape, reusing the last result for the same layer."""
+        if blend_layer.shape == shape:
+            return blend_layer
+        cache = self._blend_layer_cache
+        if cache is not None and cache[0] is blend_layer and cache[1] == shape:
+            return cache[2]
+        resized = cv2.resize(blend_layer, (shape[1], shape[0]), interpolation=cv2.INTER_AREA)
+        self._blend_layer_cache = (blend_layer, shape, resized)
+        return resized
+
     def encode_jpeg(self, frame, quality):
         """Encodes the frame into JPEG with specified quality."""
+        return self.decode_jpeg(self.encode_jpeg_bytes(frame, quality), frame)
+
+    def encode_jpeg_bytes(self, frame, quality):
+        """Encodes the frame into a JPEG byte buffer with specified quality, or returns None on failure."""
         # Ensure quality is an integer between 0 and 100
         quality = int(quality)  # Convert to integer
         quality = max(0, min(quality, 100))  # Clamp the value between 0 and 100
@@ -132,66 +284,205 @@ class ImageProcessor:
             frame = cv2.cvtColor(frame, cv2.COLOR_RGB2RGBA)
 
         success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
-        if success:
-            jpeg_image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
-            return jpeg_image
-        return frame
-
-    def apply_local_variance_normalization(self, img):
+        return buffer if success else None
+
+    def decode_jpeg(self, jpeg_data, fallback):
+        """Decodes a JPEG byte buffer, returning the fallback frame if there is nothing to decode."""
+        if jpeg_data is None:
+            return fallback
+        return cv2.imdecode(jpeg_data, cv2.IMREAD_COLOR)
+
+    def find_jpeg_scan(self, jpeg_data):
+        """Returns the start and end of the first entropy-coded scan in a JPEG stream, or None if it is malformed."""
+        if jpeg_data[:2] != b'\xff\xd8':
+            return None
+        position = 2
+        while position + 4 <= len(jpeg_data):
+            if jpeg_data[position] != 0xFF:
+                return None
+            marker = jpeg_data[position + 1]
+            if marker == 0xFF:
+                position += 1  # Fill byte
+                continue
+            if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+                position += 2  # Standalone marker without a length
+                continue
+            length = int.from_bytes(jpeg_data[position + 2:position + 4], 'big')
+            if marker == 0xDA:
+                scan_start = position + 2 + length
+                match = self.jpeg_scan_end.search(jpeg_data, scan_start)
+                return (scan_start, match.start()) if match else None
+            position += 2 + length
+        return None
+
+    def apply_wordpad_glitch_to_jpeg(self, jpeg_data):
+        """Apply the Wordpad glitch to the entropy-coded scan of a JPEG stream, keeping headers and markers.
+
+        The replacements never touch or create 0xFF bytes, so markers and byte stuffing survive. Returns None if the
+        stream has no scan to glitch.
+        """
+        jpeg_data = bytes(jpeg_data)
+        scan = self.find_jpeg_scan(jpeg_data)
+        if scan is None:
+            return None
+        scan_start, scan_end = scan
+        return jpeg_data[:scan_start] + self.wordpad_replacer(jpeg_data[scan_start:scan_end]) + jpeg_data[scan_end:]
+
+    def wordpad_glitch_jpeg_frame(self, frame, jpeg_data=None):
+        """Runs the frame's JPEG stream through the Wordpad glitch and decodes it, keeping the frame if that fails.
+
+        jpeg_data is the frame already encoded at the blend JPEG quality, if the caller has it.
+        """
+        if jpeg_data is None:
+            jpeg_data = self.encode_jpeg_bytes(frame, self.blend_jpeg_quality)
+            if jpeg_data is None:
+                return frame
+        glitched_data = self.apply_wordpad_glitch_to_jpeg(jpeg_data)
+        if glitched_data is None:
+            return frame
+        glitched = cv2.imdecode(np.frombuffer(glitched_data, np.uint8), cv2.IMREAD_COLOR)
+        if glitched is None or glitched.shape != frame.shape:
+            return frame
+        return glitched
+
+    def encode_bmp(self, frame):
+        """Encodes the frame as a BMP byte stream in a reused buffer and returns a view of it."""
+        height, width, channels = frame.shape
+        header = self._bmp_headers.get(frame.shape)
+        if header is None:
+            # Let OpenCV write the header once per shape, the pixel layout is fixed after that
+            success, bmp_data = cv2.imencode('.bmp', frame)
+            if not success:
+                return None
+            pixel_offset = int.from_bytes(bmp_data[10:14].tobytes(), 'little')
+            header = bmp_data[:pixel_offset].ravel().copy()
+            self._bmp_headers[frame.shape] = header
+
+        # Rows are stored bottom-up and padded to a multiple of four bytes
+        row_size = (width * channels + 3) & ~3
+        data = self.arena.get("bmp", (len(header) + row_size * height,))
+        data[:len(header)] = header
+        rows = data[len(header):].reshape(height, row_size)
+        rows[:, width * channels:] = 0
+        np.copyto(rows[::-1, :width * channels].reshape(height, width, channels), frame)
+        return memoryview(data)
+
+    def wordpad_glitch_frame(self, frame, jpeg_data=None):
+        """Runs the frame through a BMP or JPEG encode, the Wordpad glitch and a decode."""
+        if self.wordpad_source == "JPEG":
+            return self.wordpad_glitch_jpeg_frame(frame, jpeg_data)
+        bmp_data = self.encode_bmp(frame)
+        if bmp_data is None:
+            return frame
+        glitched_data = self.apply_wordpad_glitch_to_image(bmp_data)
+        return cv2.imdecode(np.frombuffer(glitched_data, np.uint8), cv2.IMREAD_COLOR)
+
+    def apply_local_variance_normalization(self, img, dst=None):
         """Applies local variance normalization (LVN) to the image."""
-        img = img.astype(np.float32)
-        
-        kernel_size = max(1, int(self.smoothness) * 2 + 1)
+        height, width, num_channels = img.shape
+        kernel_size = self.lvn_kernel_size(self.smoothness)
         min_threshold = max(0.01, self.threshold)
         repeat = int(round(self.repeat))
-        num_channels = img.shape[2]
+        if self.max_repeat is not None:
+            repeat = min(repeat, self.max_repeat)
+        alpha = self.amplitude
+
+        # Planar float copy of the image so every channel is contiguous for the blurs
+        work = self.arena.get("lvn_work", (num_channels, height, width), np.float32)
+        np.copyto(work, img.transpose(2, 0, 1))
+        mean = self.arena.get("lvn_mean", (height, width), np.float32)
+        deviation = self.arena.get("lvn_deviation", (height, width), np.float32)
+        variance = self.arena.get("lvn_variance", (height, width), np.float32)
+
+        # The fused kernels only implement the Gaussian blur; the governor's box blur stays on OpenCV
+        lvn_numba = self.numba_lvn() if self.lvn_backend == "Numba" and self.blur_backend == "gaussian" else None
+        if lvn_numba is not None:
+            kernel = self.lvn_kernel(kernel_size)
+            padded = self.arena.get("lvn_padded", (height, width + kernel_size - 1), np.float32)
+            for _ in range(repeat):
+                for c in range(num_channels):
+                    if c < len(self.selected_channels) and self.selected_channels[c] != 0:
+                        lvn_numba.normalize_channel(work[c], kernel, alpha, min_threshold, mean, deviation, variance, padded)
+            repeat = 0
 
-        def normalize_once(img):
-            output_img = np.zeros_like(img)
+        for _ in range(repeat):
             for c in range(num_channels):
                 if c >= len(self.selected_channels) or self.selected_channels[c] == 0:
-                    output_img[:, :, c] = img[:, :, c]
                     continue
-                
-                mean = cv2.GaussianBlur(img[:, :, c], (kernel_size, kernel_size), 0)
-                variance = cv2.GaussianBlur((img[:, :, c] - mean) ** 2, (kernel_size, kernel_size), 0)
-                std_dev = np.sqrt(variance + min_threshold)
-                alpha = self.amplitude
-                normalized_channel = (img[:, :, c] - mean) / std_dev
-                normalized_channel *= alpha
-                normalized_channel += mean
-                output_img[:, :, c] = np.clip(normalized_channel, 0, 255)
-            
-            return output_img
-
-        for _ in range(repeat):
-            img = normalize_once(img)
-        
-        return img.astype(np.uint8)
 
-    def convert_color_space(self, frame):
+                channel = work[c]
+                self.blur(channel, kernel_size, dst=mean)
+                np.subtract(channel, mean, out=deviation)
+                np.multiply(deviation, deviation, out=channel)  # Channel is rewritten below
+                self.blur(channel, kernel_size, dst=variance)
+                variance += min_threshold
+                np.sqrt(variance, out=variance)
+                np.divide(deviation, variance, out=deviation)
+                deviation *= alpha
+                deviation += mean
+                np.clip(deviation, 0, 255, out=channel)
+
+        if dst is None:
+            dst = np.empty(img.shape, dtype=np.uint8)
+        np.copyto(dst.transpose(2, 0, 1), work, casting='unsafe')
+        return dst
+
+    @staticmethod
+    def lvn_kernel_size(smoothness):
+        return max(1, int(smoothness) * 2 + 1)
+
+    @staticmethod
+    def build_lvn_kernel(kernel_size):
+        """Returns the 1-D Gaussian kernel cv2.GaussianBlur uses for this kernel size."""
+        return cv2.getGaussianKernel(kernel_size, 0, ktype=cv2.CV_32F).ravel()
+
+    def lvn_kernel(self, kernel_size):
+        kernel = self._lvn_kernels.get(kernel_size)
+        if kernel is None:
+            kernel = self.build_lvn_kernel(kernel_size)
+            self._lvn_kernels[kernel_size] = kernel
+        return kernel
+
+    def numba_lvn(self):
+        """Returns the Numba LVN module, or None (with a one-time warning) if Numba is not installed."""
+        # Imported on first use, Numba takes a while to load
+        from src import lvn_numba
+        if lvn_numba.NUMBA_AVAILABLE:
+            return lvn_numba
+        if not getattr(self, "_numba_warning_shown", False):
+            print("Warning: Numba is not installed, using the OpenCV LVN backend.")
+            self._numba_warning_shown = True
+        return None
+
+    def blur(self, img, kernel_size, dst=None):
+        """Blurs the image with the currently selected blur backend."""
+        if self.blur_backend == "box":
+            return cv2.blur(img, (kernel_size, kernel_size), dst=dst)
+        return cv2.GaussianBlur(img, (kernel_size, kernel_size), 0, dst=dst)
+
+    def convert_color_space(self, frame, dst=None):
         """Converts the color space of the frame based on the selected color space."""
         conversion_code = self.color_space_conversion.get(self.selected_color_space)
         if conversion_code is not None:
             if conversion_code:
-                converted_frame = cv2.cvtColor(frame, conversion_code)
+                converted_frame = cv2.cvtColor(frame, conversion_code, dst=dst)
             else:
                 converted_frame = frame
         else:
             converted_frame = frame
         return converted_frame
 
-    def adjust_brightness_contrast(self, img):
+    def adjust_brightness_contrast(self, img, dst=None):
         """Adjusts brightness and contrast of the image."""
         # Normalize the brightness range from the slider (-100 to 100) to (0.0 to 2.0)
         normalized_brightness = (self.brightness + 100) / 100.0  # Maps [-100, 100] to [0.0, 2.0]
         
         # Apply contrast and normalized brightness
         if self.contrast != 1.0 or normalized_brightness != 1.0:
-            img = cv2.convertScaleAbs(img, alpha=self.contrast, beta=(normalized_brightness - 1.0) * 255)
+            img = cv2.convertScaleAbs(img, dst=dst, alpha=self.contrast, beta=(normalized_brightness - 1.0) * 255)
         return img
 
-    def adjust_saturation(self, img):
+    def adjust_saturation(self, img, dst=None):
         """Adjusts saturation based on the selected color space."""
         if self.saturation == 1.0:
             return img  # No change in saturation
@@ -199,81 +490,85 @@ class ImageProcessor:
         color_space = self.selected_color_space
         if color_space == "RGB":
             # Adjust saturation in the RGB color space by scaling the distance from the gray axis
-            img = self.adjust_saturation_rgb(img)
+            img = self.adjust_saturation_rgb(img, dst)
         elif color_space == "HSV":
-            img = self.adjust_saturation_hsv(img)
+            img = self.adjust_saturation_hsv(img, dst)
         elif color_space == "HLS":
-            img = self.adjust_saturation_hls(img)
+            img = self.adjust_saturation_hls(img, dst)
         elif color_space == "LAB":
-            img = self.adjust_saturation_lab(img)
+            img = self.adjust_saturation_lab(img, dst)
         elif color_space == "LUV":
-            img = self.adjust_saturation_luv(img)
+            img = self.adjust_saturation_luv(img, dst)
         elif color_space == "XYZ":
-            img = self.adjust_saturation_xyz(img)
+            img = self.adjust_saturation_xyz(img, dst)
         elif color_space == "YCrCb":
-            img = self.adjust_saturation_ycrcb(img)
+            img = self.adjust_saturation_ycrcb(img, dst)
         elif color_space == "YUV":
-            img = self.adjust_saturation_yuv(img)
+            img = self.adjust_saturation_yuv(img, dst)
         return img
 
-    def adjust_saturation_rgb(self, img):
+    def adjust_saturation_rgb(self, img, dst=None):
         """Adjust saturation in the RGB color space by scaling the chromatic intensity."""
-        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-        img = img.astype(np.float32)
-        gray = gray[:, :, None].astype(np.float32)
-        img = gray + self.saturation * (img - gray)  # Scale chromaticity
-        return np.clip(img, 0, 255).astype(np.uint8)
-
-    def adjust_saturation_hsv(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY, dst=self.arena.get("saturation_gray", img.shape[:2]))
+        work = self.arena.like("saturation_work", img, np.float32)
+        np.copyto(work, img)
+        gray_float = self.arena.get("saturation_gray_float", img.shape[:2] + (1,), np.float32)
+        np.copyto(gray_float[:, :, 0], gray)
+        work -= gray_float
+        work *= self.saturation  # Scale chromaticity
+        work += gray_float
+        np.clip(work, 0, 255, out=work)
+        if dst is None:
+            dst = np.empty(img.shape, dtype=np.uint8)
+        np.copyto(dst, work, casting='unsafe')
+        return dst
+
+    def scale_channels(self, img, to_code, from_code, channels, dst=None):
+        """Converts img with to_code, scales the given channels by the saturation and converts back with from_code."""
+        converted = cv2.cvtColor(img, to_code, dst=self.arena.like("saturation_converted", img))
+        chroma = converted[:, :, channels]
+        work = self.arena.get("saturation_work", chroma.shape, np.float32)
+        np.multiply(chroma, self.saturation, out=work, dtype=np.float32)
+        np.clip(work, 0, 255, out=work)
+        np.copyto(chroma, work, casting='unsafe')
+        return cv2.cvtColor(converted, from_code, dst=dst)
+
+    def adjust_saturation_hsv(self, img, dst=None):
         """Adjust saturation in the HSV color space."""
-        hsv_img = cv2.cvtColor(img, cv2.COLOR_RGB2HSV).astype(np.float32)
-        hsv_img[:, :, 1] *= self.saturation  # Adjust the saturation channel
-        hsv_img[:, :, 1] = np.clip(hsv_img[:, :, 1], 0, 255)
-        return cv2.cvtColor(hsv_img.astype(np.uint8), cv2.COLOR_HSV2RGB)
+        # Adjust the saturation channel
+        return self.scale_channels(img, cv2.COLOR_RGB2HSV, cv2.COLOR_HSV2RGB, slice(1, 2), dst)
 
-    def adjust_saturation_hls(self, img):
+    def adjust_saturation_hls(self, img, dst=None):
         """Adjust saturation in the HLS color space."""
-        hls_img = cv2.cvtColor(img, cv2.COLOR_RGB2HLS).astype(np.float32)
-        hls_img[:, :, 2] *= self.saturation  # Adjust the saturation channel
-        hls_img[:, :, 2] = np.clip(hls_img[:, :, 2], 0, 255)
-        return cv2.cvtColor(hls_img.astype(np.uint8), cv2.COLOR_HLS2RGB)
+        # Adjust the saturation channel
+        return self.scale_channels(img, cv2.COLOR_RGB2HLS, cv2.COLOR_HLS2RGB, slice(2, 3), dst)
 
-    def adjust_saturation_lab(self, img):
+    def adjust_saturation_lab(self, img, dst=None):
         """Adjust saturation in the LAB color space."""
-        lab_img = cv2.cvtColor(img, cv2.COLOR_RGB2LAB).astype(np.float32)
-        lab_img[:, :, 1:3] *= self.saturation  # Scale chromaticity channels (a and b)
-        lab_img[:, :, 1:3] = np.clip(lab_img[:, :, 1:3], 0, 255)
-        return cv2.cvtColor(lab_img.astype(np.uint8), cv2.COLOR_LAB2RGB)
+        # Scale chromaticity channels (a and b)
+        return self.scale_channels(img, cv2.COLOR_RGB2LAB, cv2.COLOR_LAB2RGB, slice(1, 3), dst)
 
-    def adjust_saturation_luv(self, img):
+    def adjust_saturation_luv(self, img, dst=None):
         """Adjust saturation in the LUV color space."""
-        luv_img = cv2.cvtColor(img, cv2.COLOR_RGB2LUV).astype(np.float32)
-        luv_img[:, :, 1:3] *= self.saturation  # Adjust U and V channels
-        luv_img[:, :, 1:3] = np.clip(luv_img[:, :, 1:3], 0, 255)
-        return cv2.cvtColor(luv_img.astype(np.uint8), cv2.COLOR_LUV2RGB)
+        # Adjust U and V channels
+        return self.scale_channels(img, cv2.COLOR_RGB2LUV, cv2.COLOR_LUV2RGB, slice(1, 3), dst)
 
-    def adjust_saturation_xyz(self, img):
+    def adjust_saturation_xyz(self, img, dst=None):
         """Adjust saturation in the XYZ color space (affect chromaticity)."""
-        xyz_img = cv2.cvtColor(img, cv2.COLOR_RGB2XYZ).astype(np.float32)
-        xyz_img[:, :, 1:3] *= self.saturation  # Adjust Y and Z channels for chroma
-        xyz_img[:, :, 1:3] = np.clip(xyz_img[:, :, 1:3], 0, 255)
-        return cv2.cvtColor(xyz_img.astype(np.uint8), cv2.COLOR_XYZ2RGB)
+        # Adjust Y and Z channels for chroma
+        return self.scale_channels(img, cv2.COLOR_RGB2XYZ, cv2.COLOR_XYZ2RGB, slice(1, 3), dst)
 
-    def adjust_saturation_ycrcb(self, img):
+    def adjust_saturation_ycrcb(self, img, dst=None):
         """Adjust saturation in the YCrCb color space."""
-        ycrcb_img = cv2.cvtColor(img, cv2.COLOR_RGB2YCrCb).astype(np.float32)
-        ycrcb_img[:, :, 1:3] *= self.saturation  # Adjust Cr and Cb channels
-        ycrcb_img[:, :, 1:3] = np.clip(ycrcb_img[:, :, 1:3], 0, 255)
-        return cv2.cvtColor(ycrcb_img.astype(np.uint8), cv2.COLOR_YCrCb2RGB)
+        # Adjust Cr and Cb channels
+        return self.scale_channels(img, cv2.COLOR_RGB2YCrCb, cv2.COLOR_YCrCb2RGB, slice(1, 3), dst)
 
-    def adjust_saturation_yuv(self, img):
+    def adjust_saturation_yuv(self, img, dst=None):
         """Adjust saturation in the YUV color space."""
-        yuv_img = cv2.cvtColor(img, cv2.COLOR_RGB2YUV).astype(np.float32)
-        yuv_img[:, :, 1:3] *= self.saturation  # Adjust U and V channels
-        yuv_img[:, :, 1:3] = np.clip(yuv_img[:, :, 1:3], 0, 255)
-        return cv2.cvtColor(yuv_img.astype(np.uint8), cv2.COLOR_YUV2RGB)
+        # Adjust U and V channels
+        return self.scale_channels(img, cv2.COLOR_RGB2YUV, cv2.COLOR_YUV2RGB, slice(1, 3), dst)
 
-    def blend_images(self, base_img, blend_img):
+    def blend_images(self, base_img, blend_img, dst=None):
         """Blends two images based on the selected blending mode."""
         base_weight = self.base_weight
         blend_weight = self.blend_weight
@@ -281,85 +576,254 @@ class ImageProcessor:
         if base_img.shape != blend_img.shape:
             blend_img = cv2.resize(blend_img, (base_img.shape[1], base_img.shape[0]))
 
+        if dst is None:
+            dst = np.empty_like(base_img)
+        # Scratch buffer for the intermediate layer; uint8 arithmetic wraps around like the plain operators did
+        temp = self.arena.like("blend_temp", base_img)
+
         mode = self.selected_blending_mode
         if mode == "Overlay":
-            blended = cv2.addWeighted(base_img, base_weight, blend_img, blend_weight, 0)
+            cv2.addWeighted(base_img, base_weight, blend_img, blend_weight, 0, dst=dst)
         elif mode == "Multiply":
-            blended = cv2.multiply(base_img, blend_img)
-            blended = cv2.addWeighted(blended, blend_weight, base_img, base_weight, 0)
+            cv2.multiply(base_img, blend_img, dst=temp)
+            cv2.addWeighted(temp, blend_weight, base_img, base_weight, 0, dst=dst)
         elif mode == "Linear Burn":
-            blended = base_img + blend_img - 255
-            blended = cv2.addWeighted(blended, blend_weight, base_img, base_weight, 0)
+            np.add(base_img, blend_img, out=temp)
+            np.subtract(temp, 255, out=temp)
+            cv2.addWeighted(temp, blend_weight, base_img, base_weight, 0, dst=dst)
         elif mode == "Screen":
-            blended = cv2.addWeighted(base_img, base_weight, 255 - blend_img, blend_weight, 0)
+            np.subtract(255, blend_img, out=temp)
+            cv2.addWeighted(base_img, base_weight, temp, blend_weight, 0, dst=dst)
         elif mode == "Darken":
-            blended = cv2.min(base_img, blend_img)
-            blended = cv2.addWeighted(blended, blend_weight, base_img, base_weight, 0)
+            cv2.min(base_img, blend_img, dst=temp)
+            cv2.addWeighted(temp, blend_weight, base_img, base_weight, 0, dst=dst)
         elif mode == "Lighten":
-            blended = cv2.max(base_img, blend_img)
-            blended = cv2.addWeighted(blended, blend_weight, base_img, base_weight, 0)
+            cv2.max(base_img, blend_img, dst=temp)
+            cv2.addWeighted(temp, blend_weight, base_img, base_weight, 0, dst=dst)
         elif mode == "Difference":
-            blended = cv2.absdiff(base_img, blend_img)
-            blended = cv2.addWeighted(blended, blend_weight, base_img, base_weight, 0)
+            cv2.absdiff(base_img, blend_img, dst=temp)
+            cv2.addWeighted(temp, blend_weight, base_img, base_weight, 0, dst=dst)
         elif mode == "Exclusion":
-            blended = base_img + blend_img - 2 * cv2.multiply(base_img, blend_img)
-            blended = cv2.addWeighted(blended, blend_weight, base_img, base_weight, 0)
+            product = cv2.multiply(base_img, blend_img, dst=self.arena.like("blend_product", base_img))
+            np.multiply(product, 2, out=product)
+            np.add(base_img, blend_img, out=temp)
+            np.subtract(temp, product, out=temp)
+            cv2.addWeighted(temp, blend_weight, base_img, base_weight, 0, dst=dst)
         elif mode == "Soft Light":
-            blended = cv2.addWeighted(base_img, base_weight, blend_img, blend_weight, 0)
+            cv2.addWeighted(base_img, base_weight, blend_img, blend_weight, 0, dst=dst)
         elif mode == "Hard Light":
-            blended = cv2.addWeighted(base_img, base_weight, blend_img, -blend_weight, 0)
+            cv2.addWeighted(base_img, base_weight, blend_img, -blend_weight, 0, dst=dst)
         elif mode == "Dodge":
-            blended = cv2.divide(base_img, 255 - blend_img)
-            blended = cv2.addWeighted(blended, blend_weight, base_img, base_weight, 0)
+            np.subtract(255, blend_img, out=temp)
+            cv2.divide(base_img, temp, dst=temp)
+            cv2.addWeighted(temp, blend_weight, base_img, base_weight, 0, dst=dst)
         elif mode == "Burn":
-            blended = 255 - cv2.divide(255 - base_img, blend_img)
-            blended = cv2.addWeighted(blended, blend_weight, base_img, base_weight, 0)
+            np.subtract(255, base_img, out=temp)
+            cv2.divide(temp, blend_img, dst=temp)
+            np.subtract(255, temp, out=temp)
+            cv2.addWeighted(temp, blend_weight, base_img, base_weight, 0, dst=dst)
         else:
-            blended = base_img
+            np.copyto(dst, base_img)
+
+        return dst
+
+    def process_frame(self, frame, blend_layer=None):
+        """Main method to process a video frame.
+
+        blend_layer is an optional frame from another source used in place of the frame's own copy when blending.
+        Intermediate frames live in the processor's buffer arena; only the returned frame is newly allocated.
+        """
+        self._apply_pending_settings()
+        self.arena.begin_frame()
+        output = self._render_frame(frame, blend_layer)
+
+        fade_from = self._fade_from
+        if fade_from is not None:
+            # The output is never an arena buffer, so the outgoing settings can reuse the same buffers
+            faded = fade_from._render_frame(frame, blend_layer)
+            weight = self._fade_remaining / (self._fade_frames + 1)
+            output = cv2.addWeighted(faded, weight, output, 1.0 - weight, 0, dst=output)
+            self._fade_remaining -= 1
+            if self._fade_remaining <= 0:
+                self._fade_from = None
+        self.arena.end_frame()
+        return output
+
+    def _render_frame(self, frame, blend_layer=None):
+        arena = self.arena
+
+        # Work on a downscaled proxy when the governor asks for it
+        output_size = (frame.shape[1], frame.shape[0])
+        if self.proxy_scale < 1.0:
+            proxy_size = (max(1, round(output_size[0] * self.proxy_scale)), max(1, round(output_size[1] * self.proxy_scale)))
+            proxy = arena.get("proxy", (proxy_size[1], proxy_size[0], frame.shape[2]), frame.dtype)
+            frame = cv2.resize(frame, proxy_size, dst=proxy, interpolation=cv2.INTER_AREA)
 
-        blended = np.clip(blended, 0, 255).astype(np.uint8)
-        return blended
-
-    def process_frame(self, frame):
-        """Main method to process a video frame."""
         # Adjust brightness and contrast first
-        frame = self.adjust_brightness_contrast(frame)
+        frame = self.adjust_brightness_contrast(frame, dst=arena.like("brightness_contrast", frame))
 
         # Adjust saturation
-        frame = self.adjust_saturation(frame)
-
-        # Convert to JPEG with blend JPEG quality
-        base_frame = self.encode_jpeg(frame, self.blend_jpeg_quality)
-        blend_frame = base_frame.copy()
+        frame = self.adjust_saturation(frame, dst=arena.like("saturation", frame))
+
+        # Convert to JPEG with blend JPEG quality, keeping the stream for the JPEG Wordpad glitch
+        base_jpeg = self.encode_jpeg_bytes(frame, self.blend_jpeg_quality)
+        base_frame = self.decode_jpeg(base_jpeg, frame)
+        # Another source's frames only stand in for the blend layer when blending is on; otherwise the output
+        # would be the other source instead of this one
+        if blend_layer is not None and self.apply_blending:
+            blend_layer = self.fit_blend_layer(blend_layer, frame.shape)
+            blend_jpeg = self.encode_jpeg_bytes(blend_layer, self.blend_jpeg_quality)
+            blend_frame = self.decode_jpeg(blend_jpeg, blend_layer)
+        else:
+            # No stage writes into its input, so the blend layer can share the base frame
+            blend_frame = base_frame
+            blend_jpeg = base_jpeg
 
         # Apply LVN and Wordpad glitch to base frame if enabled
         if self.apply_lvn_to_base:
-            base_frame = self.apply_local_variance_normalization(base_frame)
+            base_frame = self.apply_local_variance_normalization(base_frame, dst=arena.like("lvn_base", base_frame))
+            base_jpeg = None  # The stream no longer matches the frame
         if self.apply_wordpad_glitch_to_base:
-            success, bmp_data = cv2.imencode('.bmp', base_frame)
-            if success:
-                glitched_data = self.apply_wordpad_glitch_to_image(bmp_data.tobytes())
-                base_frame = cv2.imdecode(np.frombuffer(glitched_data, np.uint8), cv2.IMREAD_COLOR)
+            base_frame = self.wordpad_glitch_frame(base_frame, base_jpeg)
 
         # Apply LVN and Wordpad glitch to blend frame if enabled
         if self.apply_lvn_to_blend:
-            blend_frame = self.apply_local_variance_normalization(blend_frame)
+            blend_frame = self.apply_local_variance_normalization(blend_frame, dst=arena.like("lvn_blend", blend_frame))
+            blend_jpeg = None
         if self.apply_wordpad_glitch_to_blend:
-            success, bmp_data = cv2.imencode('.bmp', blend_frame)
-            if success:
-                glitched_data = self.apply_wordpad_glitch_to_image(bmp_data.tobytes())
-                blend_frame = cv2.imdecode(np.frombuffer(glitched_data, np.uint8), cv2.IMREAD_COLOR)
+            blend_frame = self.wordpad_glitch_frame(blend_frame, blend_jpeg)
 
         # Convert color space
-        base_frame = self.convert_color_space(base_frame)
-        blend_frame = self.convert_color_space(blend_frame)
+        shared = blend_frame is base_frame
+        base_frame = self.convert_color_space(base_frame, dst=arena.like("color_base", base_frame))
+        if shared:
+            blend_frame = base_frame
+        else:
+            blend_frame = self.convert_color_space(blend_frame, dst=arena.like("color_blend", blend_frame))
 
         # Apply blending if enabled
         if self.apply_blending:
-            blended_frame = self.blend_images(base_frame, blend_frame)
+            blended_frame = self.blend_images(base_frame, blend_frame, dst=arena.like("blended", base_frame))
         else:
             blended_frame = blend_frame
 
         # Convert final output back to JPEG
-        return self.encode_jpeg(blended_frame, self.jpeg_quality)
+        output = self.encode_jpeg(blended_frame, self.jpeg_quality)
+        if (output.shape[1], output.shape[0]) != output_size:
+            output = cv2.resize(output, output_size, interpolation=cv2.INTER_LINEAR)
+        elif output is blended_frame or output is frame:
+            output = output.copy()  # Encoding failed; do not hand out an arena buffer
+        return output
+
+    def process_batch(self, frames):
+        """Processes a stack of frames (N x H x W x 3) and returns the processed stack.
+
+        Per-pixel stages run once over the whole stack, while the JPEG round trips, LVN and the Wordpad glitch
+        run frame by frame into reused buffers. Batches are meant for offline renders, so the governor's proxy
+        scale is not applied.
+        """
+        self._apply_pending_settings()
+        self._fade_from = None  # Offline renders switch settings without a crossfade
+        frames = np.ascontiguousarray(frames)
+        output = np.empty(frames.shape, dtype=np.uint8)
+        if len(frames) == 0:
+            return output
+
+        # Large stacks are split so the per-pixel passes stay cache friendly
+        chunk_size = max(1, self.batch_chunk_bytes // max(1, frames[0].nbytes))
+        for start in range(0, len(frames), chunk_size):
+            self._process_stack(frames[start:start + chunk_size], output[start:start + chunk_size])
+        return output
+
+    def _process_stack(self, frames, output):
+        count, height, width, channels = frames.shape
+        arena = self.arena
+        arena.begin_frame()
+
+        # Per-pixel operations don't care where one frame ends, so the stack is processed as one tall image
+        def tall(stack):
+            return stack.reshape(count * height, width, channels)
+
+        def buffer(name):
+            return arena.get(name, frames.shape, np.uint8)
+
+        # Adjust brightness and contrast first
+        stack = self.adjust_brightness_contrast(tall(frames), dst=tall(buffer("batch_brightness_contrast")))
+
+        # Adjust saturation
+        stack = self.adjust_saturation(stack, dst=tall(buffer("batch_saturation"))).reshape(frames.shape)
+
+        # Convert to JPEG with blend JPEG quality; the blend layer shares the result
+        base_stack = buffer("batch_jpeg")
+        jpegs = []
+        for i in range(count):
+            jpegs.append(self.encode_jpeg_bytes(stack[i], self.blend_jpeg_quality))
+            np.copyto(base_stack[i], self.decode_jpeg(jpegs[i], stack[i]))
+        blend_stack = base_stack
+
+        # Apply LVN and Wordpad glitch to base and blend frames if enabled
+        base_jpegs = blend_jpegs = jpegs
+        if self.apply_lvn_to_base:
+            base_stack = self._lvn_batch(base_stack, buffer("batch_lvn_base"))
+            base_jpegs = [None] * count  # The streams no longer match the frames
+        if self.apply_wordpad_glitch_to_base:
+            base_stack = self._wordpad_glitch_batch(base_stack, base_jpegs, buffer("batch_wordpad_base"))
+        if self.apply_lvn_to_blend:
+            blend_stack = self._lvn_batch(blend_stack, buffer("batch_lvn_blend"))
+            blend_jpegs = [None] * count
+        if self.apply_wordpad_glitch_to_blend:
+            blend_stack = self._wordpad_glitch_batch(blend_stack, blend_jpegs, buffer("batch_wordpad_blend"))
 
+        # Convert color space
+        shared = blend_stack is base_stack
+        base_stack = self.convert_color_space(tall(base_stack), dst=tall(buffer("batch_color_base")))
+        if shared:
+            blend_stack = base_stack
+        else:
+            blend_stack = self.convert_color_space(tall(blend_stack), dst=tall(buffer("batch_color_blend")))
+
+        # Apply blending if enabled
+        if self.apply_blending:
+            blended_stack = self.blend_images(base_stack, blend_stack, dst=tall(buffer("batch_blended")))
+        else:
+            blended_stack = blend_stack
+        blended_stack = blended_stack.reshape(frames.shape)
+
+        # Convert final output back to JPEG
+        for i in range(count):
+            np.copyto(output[i], self.encode_jpeg(blended_stack[i], self.jpeg_quality))
+        arena.end_frame()
+
+    def _lvn_batch(self, stack, dst):
+        for i in range(len(stack)):
+            self.apply_local_variance_normalization(stack[i], dst=dst[i])
+        return dst
+
+    def _wordpad_glitch_batch(self, stack, jpegs, dst):
+        for i in range(len(stack)):
+            glitched = self.wordpad_glitch_frame(stack[i], jpegs[i])
+            # A stream that no longer decodes to the same size keeps the unglitched frame
+            if glitched is None or glitched.shape != stack[i].shape:
+                glitched = stack[i]
+            np.copyto(dst[i], glitched)
+        return dst
+
+    def process_stream(self, frames, batch_size=16):
+        """Processes an iterable of frames in batches and yields the processed frames in order."""
+        batch = []
+        for frame in frames:
+            if batch and frame.shape != batch[0].shape:
+                yield from self._process_collected(batch)
+                batch = []
+            batch.append(frame)
+            if len(batch) == batch_size:
+                yield from self._process_collected(batch)
+                batch = []
+        if batch:
+            yield from self._process_collected(batch)
+
+    def _process_collected(self, batch):
+        stack = self.arena.get("batch_input", (len(batch),) + batch[0].shape, batch[0].dtype)
+        for i, frame in enumerate(batch):
+            np.copyto(stack[i], frame)
+        yield from self.process_batch(stack)
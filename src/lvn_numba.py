@@ -0,0 +1,131 @@
+"""Optional Numba backend for local variance normalization.
+
+The separable Gaussian blurs are written as row kernels and the normalise/scale/clip arithmetic is fused into the
+vertical passes, so each LVN repeat streams a channel through memory four times instead of about ten. Rows are
+processed in parallel with prange. Everything here is only usable when Numba is installed.
+"""
+import threading
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Numba's workqueue threading layer (used when neither TBB nor OpenMP is installed) aborts the process when parallel
+# kernels are launched from several threads at once, as the shared worker pool does. Launches are serialised until
+# the first one has shown which layer is in use, and for good if it is workqueue.
+_launch_lock = threading.Lock()
+_threading_layer = None
+
+if NUMBA_AVAILABLE:
+
+    @njit(inline='always')
+    def _reflect(index, size):
+        # Same border handling as OpenCV's default (BORDER_REFLECT_101)
+        if size == 1:
+            return 0
+        while index < 0 or index >= size:
+            if index < 0:
+                index = -index
+            else:
+                index = 2 * size - 2 - index
+        return index
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _blur_rows(src, mean, squared, kernel, padded, dst):
+        # Horizontal blur of src, or of (src - mean) ** 2 without materialising it. Each row is copied once into a
+        # reflect-padded scratch row so the tap loops run over contiguous memory without border checks.
+        height, width = src.shape
+        radius = kernel.shape[0] // 2
+        for y in prange(height):
+            row = padded[y]
+            inner = row[radius:radius + width]
+            if squared:
+                source_row = src[y]
+                mean_row = mean[y]
+                for x in range(width):
+                    deviation = source_row[x] - mean_row[x]
+                    inner[x] = deviation * deviation
+            else:
+                inner[:] = src[y]
+            for i in range(radius):
+                row[radius - 1 - i] = row[radius + _reflect(-1 - i, width)]
+                row[radius + width + i] = row[radius + _reflect(width + i, width)]
+            # The kernel is symmetric, so taps at the same distance share one multiply
+            out = dst[y]
+            centre = kernel[radius]
+            for x in range(width):
+                out[x] = centre * row[x + radius]
+            # Slicing first lets the tap loops vectorise
+            for k in range(radius):
+                weight = kernel[k]
+                left = row[k:k + width]
+                right = row[2 * radius - k:2 * radius - k + width]
+                for x in range(width):
+                    out[x] += weight * (left[x] + right[x])
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _blur_columns(src, kernel, dst):
+        height, width = src.shape
+        radius = kernel.shape[0] // 2
+        for y in prange(height):
+            out = dst[y]
+            centre = src[y]
+            for x in range(width):
+                out[x] = kernel[radius] * centre[x]
+            for k in range(radius):
+                above = src[_reflect(y + k - radius, height)]
+                below = src[_reflect(y + radius - k, height)]
+                weight = kernel[k]
+                for x in range(width):
+                    out[x] += weight * (above[x] + below[x])
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _blur_columns_normalize(src, mean, kernel, alpha, min_threshold, channel, variance_row):
+        # Vertical blur of the squared deviation, immediately followed by normalise, scale and clip into channel
+        height, width = src.shape
+        radius = kernel.shape[0] // 2
+        for y in prange(height):
+            row_variance = variance_row[y]
+            centre = src[y]
+            for x in range(width):
+                row_variance[x] = kernel[radius] * centre[x]
+            for k in range(radius):
+                above = src[_reflect(y + k - radius, height)]
+                below = src[_reflect(y + radius - k, height)]
+                weight = kernel[k]
+                for x in range(width):
+                    row_variance[x] += weight * (above[x] + below[x])
+            row_mean = mean[y]
+            row_channel = channel[y]
+            for x in range(width):
+                value = (row_channel[x] - row_mean[x]) / np.sqrt(row_variance[x] + min_threshold) * alpha + row_mean[x]
+                if value < 0.0:
+                    value = 0.0
+                elif value > 255.0:
+                    value = 255.0
+                row_channel[x] = value
+
+def normalize_channel(channel, kernel, alpha, min_threshold, mean, temp, variance, padded):
+    """Runs one LVN pass over a contiguous float32 channel in place.
+
+    mean, temp and variance are scratch buffers with the channel's shape, padded has room for the kernel radius on
+    both sides of every row, and kernel is a 1-D float32 Gaussian kernel.
+    """
+    global _threading_layer
+    if _threading_layer is not None and _threading_layer != "workqueue":
+        _normalize_channel(channel, kernel, alpha, min_threshold, mean, temp, variance, padded)
+        return
+    with _launch_lock:
+        _normalize_channel(channel, kernel, alpha, min_threshold, mean, temp, variance, padded)
+        _threading_layer = numba.threading_layer()
+
+def _normalize_channel(channel, kernel, alpha, min_threshold, mean, temp, variance, padded):
+    _blur_rows(channel, mean, False, kernel, padded, temp)
+    _blur_columns(temp, kernel, mean)
+    _blur_rows(channel, mean, True, kernel, padded, temp)
+    # Single precision scalars keep the fused arithmetic in float32
+    _blur_columns_normalize(temp, mean, kernel, np.float32(alpha), np.float32(min_threshold), channel, variance)
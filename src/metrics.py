@@ -0,0 +1,220 @@
+import bisect
+import csv
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def resident_memory_bytes():
+    """Returns the resident memory of this process in bytes, or None if the platform doesn't tell."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed buckets, in seconds."""
+
+    buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)  # The last slot counts values above every bucket
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.count, self.sum
+
+
+class SessionMetrics:
+    """Frame counters, latency histograms and gauges for a long-running session.
+
+    Updates come from the capture and worker threads; every update holds a lock for a single addition.
+    """
+
+    counter_descriptions = {
+        "frames_captured": "Frames read from all sources.",
+        "frames_processed": "Frames that went through the processor.",
+        "frames_dropped": "Frames that were read but never shown.",
+        "loop_restarts": "Times a video file was rewound to its loop start.",
+        "capture_failures": "Sources that could not be opened or stopped delivering frames.",
+        "processing_errors": "Frames whose processing raised an exception.",
+    }
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.counters = {name: 0 for name in self.counter_descriptions}
+        self.histograms = {
+            "capture_seconds": LatencyHistogram("capture_seconds", "Time spent reading one frame from a source."),
+            "processing_seconds": LatencyHistogram("processing_seconds", "Time spent processing one frame."),
+            "frame_latency_seconds": LatencyHistogram("frame_latency_seconds", "Time from reading a frame to showing it."),
+        }
+        self.gauges = {}
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe(self, name, seconds):
+        self.histograms[name].observe(seconds)
+
+    def add_gauge(self, name, description, read):
+        """Registers a value that is read whenever metrics are exported; read returns a number or None."""
+        self.gauges[name] = (description, read)
+
+    def snapshot(self):
+        """Returns every counter, histogram and gauge as plain data."""
+        with self.lock:
+            counters = dict(self.counters)
+        histograms = {}
+        for name, histogram in self.histograms.items():
+            counts, count, total = histogram.snapshot()
+            histograms[name] = {"counts": counts, "count": count, "sum": total}
+        gauges = {"uptime_seconds": time.time() - self.started_at, "resident_memory_bytes": resident_memory_bytes()}
+        for name, (_, read) in self.gauges.items():
+            gauges[name] = read()
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def prometheus_text(self, prefix="lvndr"):
+        """Formats a snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# HELP {prefix}_{name}_total {self.counter_descriptions[name]}")
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, data in snapshot["histograms"].items():
+            lines.append(f"# HELP {prefix}_{name} {self.histograms[name].description}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            cumulative = 0
+            for bound, count in zip(LatencyHistogram.buckets, data["counts"]):
+                cumulative += count
+                lines.append(f'{prefix}_{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_{name}_bucket{{le="+Inf"}} {data["count"]}')
+            lines.append(f"{prefix}_{name}_sum {data['sum']}")
+            lines.append(f"{prefix}_{name}_count {data['count']}")
+        descriptions = {"uptime_seconds": "Seconds since the session started.", "resident_memory_bytes": "Resident memory of the process."}
+        descriptions.update({name: description for name, (description, _) in self.gauges.items()})
+        for name, value in snapshot["gauges"].items():
+            if value is None:
+                continue
+            lines.append(f"# HELP {prefix}_{name} {descriptions[name]}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves the metrics in Prometheus text format on a local HTTP endpoint (/metrics)."""
+
+    def __init__(self, metrics, port=9108, host="127.0.0.1"):
+        metrics_ref = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics_ref.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsLogger:
+    """Appends a summary of the metrics to a CSV or JSONL file (chosen by extension) at a fixed interval.
+
+    Each row holds the totals plus the frame rate and mean latencies of the last interval, so drift over a long
+    session shows up as a trend in the file.
+    """
+
+    def __init__(self, metrics, path, interval=60.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.previous = None
+
+    def start(self):
+        self.previous = self.metrics.snapshot()
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.write_row()  # Record the final interval as well
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.write_row()
+            except Exception as e:
+                # One bad sample must not end logging for the rest of the session
+                print(f"Warning: Could not sample metrics: {e}")
+
+    def row(self, snapshot, previous):
+        elapsed = max(1e-9, snapshot["timestamp"] - previous["timestamp"])
+        row = {"time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(snapshot["timestamp"]))}
+        row.update(snapshot["counters"])
+        row["interval_fps"] = (snapshot["counters"]["frames_processed"] - previous["counters"]["frames_processed"]) / elapsed
+        for name, data in snapshot["histograms"].items():
+            count = data["count"] - previous["histograms"][name]["count"]
+            total = data["sum"] - previous["histograms"][name]["sum"]
+            row[f"interval_mean_{name}"] = total / count if count else None
+        row.update(snapshot["gauges"])
+        return row
+
+    def write_row(self):
+        snapshot = self.metrics.snapshot()
+        row = self.row(snapshot, self.previous)
+        self.previous = snapshot
+        try:
+            if self.path.endswith(".csv"):
+                new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                with open(self.path, "a", newline="") as f:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    if new_file:
+                        writer.writeheader()
+                    writer.writerow(row)
+            else:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(row) + "\n")
+        except OSError as e:
+            print(f"Warning: Could not write metrics log: {e}")
@@ -0,0 +1,53 @@
+import glob
+import json
+import os
+from src.image_processor import ImageProcessor
+
+class BankedPreset:
+    """A preset file with everything a switch needs worked out in advance."""
+
+    def __init__(self, name, preset):
+        self.name = name
+        # A switch replaces the whole configuration, so anything the file leaves out falls back to the default
+        self.settings = ImageProcessor.default_settings()
+        self.settings.update(ImageProcessor.preset_settings(preset))
+        self.preset = ImageProcessor.preset_from_settings(self.settings)  # The same values in the GUI's keys
+        # The LVN Gaussian kernel is the only table the pipeline derives from its settings
+        kernel_size = ImageProcessor.lvn_kernel_size(self.settings["smoothness"])
+        self.lvn_kernels = {kernel_size: ImageProcessor.build_lvn_kernel(kernel_size)}
+
+
+class PresetBank:
+    """Every preset in the presets folder, loaded at startup so switching between them never touches the disk."""
+
+    def __init__(self, directory="presets"):
+        self.directory = directory
+        self.presets = []
+
+    def load(self):
+        """(Re)reads every *.json file in the folder; files that can't be read are skipped."""
+        presets = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            try:
+                with open(path, 'r') as f:
+                    preset = json.load(f)
+                presets.append(BankedPreset(os.path.splitext(os.path.basename(path))[0], preset))
+            except (OSError, ValueError, TypeError, AttributeError) as e:
+                print(f"Warning: Skipping preset {path}: {e}")
+        self.presets = presets
+        return self
+
+    def names(self):
+        return [preset.name for preset in self.presets]
+
+    def get(self, index):
+        if 0 <= index < len(self.presets):
+            return self.presets[index]
+        return None
+
+    def switch(self, processor, index, crossfade_frames=0):
+        """Queues preset index on the processor; it takes over at the next frame boundary. Returns the preset or None."""
+        preset = self.get(index)
+        if preset is not None:
+            processor.queue_settings(preset.settings, preset.lvn_kernels, crossfade_frames)
+        return preset
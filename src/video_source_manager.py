@@ -1,85 +1,202 @@
 import cv2
+import itertools
+import os
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.frame_index import FrameIndex
+from src.frame_rate_governor import FrameRateGovernor
+from src.metrics import MetricsLogger, MetricsServer, SessionMetrics
 
-class VideoSourceManager:
-    def __init__(self, processor):
+class VideoSource:
+    """A single webcam or video file with its own processor settings and capture thread."""
+
+    def __init__(self, source_id, target, processor, window_name, loop_video=False, governor=None, metrics=None):
+        self.source_id = source_id
+        self.target = target
         self.processor = processor
+        self.window_name = window_name
+        self.loop_video = loop_video
+        self.governor = governor
+        self.metrics = metrics or SessionMetrics()
         self.capture = None
         self.running = False
         self.lock = threading.Lock()
         self.thread = None
-        self.window_name = "Processed Video"
 
-    def start_webcam(self):
-        self.stop()  # Stop any ongoing capture before starting a new one
-        self.capture = cv2.VideoCapture(0)  
-        if not self.capture.isOpened():
-            print("Error: Could not open webcam.")
-            return
-        self.running = True
-        self.thread = threading.Thread(target=self._capture_loop)
-        self.thread.start()
+        # Another VideoSource whose frames are used as this source's blend layer
+        self.blend_source = None
+        self.latest_frame = None
 
-    def start_video_file(self, file_path):
-        self.stop()  # Stop any ongoing capture before starting a new one
-        self.capture = cv2.VideoCapture(file_path)  
+        self.frames_processed = 0
+        self.started_at = None
+
+        # Called with every key other than 'q' pressed in the video window, from the capture thread
+        self.key_handler = None
+
+        # Playback position and loop points of video files, in frames
+        self.index = None
+        self.position = 0
+        self.pending_seek = None
+        self.loop_in = None
+        self.loop_out = None
+        self.reported_frame_count = 0  # From the container, used until the index is ready
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.target)
         if not self.capture.isOpened():
-            print("Error: Could not open video file.")
-            return
+            return False
+        if isinstance(self.target, str):
+            # Read once here: VideoCapture isn't thread-safe and the capture thread owns it from now on
+            self.reported_frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            # The one-time index pass runs next to playback; seeks fall back to OpenCV until it is ready
+            threading.Thread(target=self._load_index, daemon=True).start()
+        return True
+
+    def _load_index(self):
+        self.index = FrameIndex.load_or_build(self.target)
+
+    def frame_count(self):
+        if self.index is not None:
+            return self.index.frame_count
+        return self.reported_frame_count
+
+    def seek(self, frame):
+        """Requests a jump to the given frame; the capture thread performs it before its next read."""
+        with self.lock:
+            self.pending_seek = max(0, int(frame))
 
-        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    def set_loop_points(self, loop_in=None, loop_out=None):
+        """Loops playback between two frames (inclusive); None uses the start or end of the file."""
+        if loop_in is not None and loop_out is not None and loop_out < loop_in:
+            loop_in, loop_out = loop_out, loop_in
+        self.loop_in = loop_in
+        self.loop_out = loop_out
 
+    def _seek_now(self, frame):
+        if self.index is not None:
+            self.position = self.index.seek(self.capture, frame, self.position)
+        else:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, frame)
+            self.position = frame
+
+    def frame_size(self):
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480
+        return width, height
+
+    def start(self, pool):
         self.running = True
-        self.thread = threading.Thread(target=self._capture_loop, args=(True, width, height)) 
+        self.started_at = time.perf_counter()
+        self.frames_processed = 0
+        self.thread = threading.Thread(target=self._capture_loop, args=(pool,))
         self.thread.start()
 
     def stop(self):
         with self.lock:
-            if self.running:
-                self.running = False  # Set running to False to stop the loop
-                # Release the capture device if it's open
-                if self.capture is not None:
-                    if self.capture.isOpened():
-                        self.capture.release()  
-                    self.capture = None  
+            self.running = False
+        # Wait for the thread to finish before releasing the capture it reads from
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+        self.clean_up()
+
+    def throughput(self):
+        """Returns the average number of processed frames per second since the source started."""
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.perf_counter() - self.started_at
+        return self.frames_processed / elapsed if elapsed > 0 else 0.0
 
-                # Wait for the thread to finish
-                if self.thread is not None:
-                    self.thread.join()  
-                    self.thread = None  # Reset the thread reference
+    def _process(self, frame, blend_layer):
+        """Runs on the shared worker pool."""
+        start_time = time.perf_counter()
+        processed_frame = self.processor.process_frame(frame, blend_layer)
+        elapsed = time.perf_counter() - start_time
+        if self.governor is not None:
+            self.governor.update(elapsed)
+        self.frames_processed += 1
+        self.metrics.increment("frames_processed")
+        self.metrics.observe("processing_seconds", elapsed)
+        return processed_frame
 
-                cv2.destroyAllWindows()  
+    def _show(self, pending):
+        future, captured_at = pending
+        try:
+            processed_frame = future.result()
+        except Exception as e:
+            # One bad frame must not end a session that runs for days
+            print(f"Error: Could not process frame: {e}")
+            self.metrics.increment("processing_errors")
+            self.metrics.increment("frames_dropped")
+            return
+        cv2.imshow(self.window_name, processed_frame)
+        self.metrics.observe("frame_latency_seconds", time.perf_counter() - captured_at)
 
-    def _capture_loop(self, loop_video=False, width=640, height=480):
-        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)  
-        cv2.resizeWindow(self.window_name, width, height)  
+    def _capture_loop(self, pool):
+        width, height = self.frame_size()
+        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(self.window_name, width, height)
 
+        # At most one frame per source is queued on the pool, so sources are served in turn
+        pending = None
         while True:
             with self.lock:
                 if not self.running:
                     break
                 if not self.capture or not self.capture.isOpened():
                     break
+                seek_to = self.pending_seek
+                self.pending_seek = None
+
+            if seek_to is None and self.loop_out is not None and self.position > self.loop_out:
+                seek_to = self.loop_in or 0
+                self.metrics.increment("loop_restarts")
+            if seek_to is not None:
+                self._seek_now(seek_to)
 
+            captured_at = time.perf_counter()
             ret, frame = self.capture.read()
 
             if not ret:
-                if loop_video and self.running:
-                    self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)  
+                if self.loop_video and self.running:
+                    self.metrics.increment("loop_restarts")
+                    self._seek_now(self.loop_in or 0)
                     continue
                 else:
+                    print("Error: Could not read from the video source.")
+                    self.metrics.increment("capture_failures")
                     break
 
-            processed_frame = self.processor.process_frame(frame)
-            cv2.imshow(self.window_name, processed_frame)
+            self.metrics.observe("capture_seconds", time.perf_counter() - captured_at)
+            self.metrics.increment("frames_captured")
+            self.position += 1
+            self.latest_frame = frame
+
+            # Read the next frame while the previous one is being processed
+            if pending is not None:
+                self._show(pending)
+
+            blend_source = self.blend_source
+            blend_layer = None
+            if blend_source is not None and self.processor.apply_blending:
+                blend_layer = blend_source.latest_frame
+            pending = (pool.submit(self._process, frame, blend_layer), captured_at)
 
             # Check for 'q' key to exit
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
                 # Instead of stopping immediately, set running to False
                 with self.lock:
                     self.running = False
                 break
+            if key != 0xFF and self.key_handler is not None:
+                self.key_handler(chr(key))
+
+        if pending is not None:
+            # The last frame is never shown
+            pending[0].exception()
+            self.metrics.increment("frames_dropped")
 
         # Clean up after exiting the loop
         self.clean_up()
@@ -88,9 +205,192 @@ class VideoSourceManager:
         """Ensure everything is cleaned up properly."""
         with self.lock:
             if self.capture is not None:
-                self.capture.release()  # Release the webcam
+                self.capture.release()  # Release the webcam or file
                 self.capture = None  # Reset capture
-        cv2.destroyAllWindows()  # Close any OpenCV windows
+        try:
+            cv2.destroyWindow(self.window_name)
+        except cv2.error:
+            pass  # Window was never created or is already closed
+
+
+class VideoSourceManager:
+    def __init__(self, processor, max_workers=None):
+        self.processor = processor
+        self.sources = {}
+        self.lock = threading.Lock()
+        self.window_name = "Processed Video"
+        self.governor = FrameRateGovernor(processor)
+        self.primary_id = None
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.pool = None
+        self._source_ids = itertools.count()
+
+        self.metrics = SessionMetrics()
+        self.metrics.add_gauge("active_sources", "Sources currently capturing.", lambda: len(self.throughput()) - 1)
+        self.metrics.add_gauge("buffer_arena_bytes", "Memory held by the processors' buffer arenas.", self._arena_bytes)
+        self.metrics.add_gauge("governor_level", "Degradation level of the frame-rate governor.", lambda: self.governor.level)
+        self.metrics_server = None
+        self.metrics_logger = None
+
+        # Called with keys pressed in any video window (other than 'q'); runs on a capture thread
+        self.on_key = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="lvndr-worker")
+        return self.pool
+
+    def _start_source(self, target, processor, loop_video=False, primary=False):
+        source_id = next(self._source_ids)
+        if primary:
+            window_name = self.window_name
+            governor = self.governor
+        else:
+            window_name = f"{self.window_name} ({source_id})"
+            governor = None
+
+        source = VideoSource(source_id, target, processor, window_name, loop_video, governor, self.metrics)
+        source.key_handler = self._key_pressed
+        if not source.open():
+            source.clean_up()
+            self.metrics.increment("capture_failures")
+            return None
+
+        with self.lock:
+            self.sources[source_id] = source
+            if primary:
+                self.primary_id = source_id
+        source.start(self._get_pool())
+        return source_id
+
+    def start_webcam(self, index=0):
+        self.stop()  # Stop any ongoing capture before starting a new one
+        if self._start_source(index, self.processor, primary=True) is None:
+            print("Error: Could not open webcam.")
+
+    def start_video_file(self, file_path):
+        self.stop()  # Stop any ongoing capture before starting a new one
+        if self._start_source(file_path, self.processor, loop_video=True, primary=True) is None:
+            print("Error: Could not open video file.")
+
+    def add_webcam(self, index=0, processor=None):
+        """Opens an additional webcam alongside the running sources and returns its id."""
+        processor = processor or self.processor.snapshot()
+        source_id = self._start_source(index, processor)
+        if source_id is None:
+            print(f"Error: Could not open webcam {index}.")
+        return source_id
+
+    def add_video_file(self, file_path, processor=None):
+        """Opens an additional video file alongside the running sources and returns its id."""
+        processor = processor or self.processor.snapshot()
+        source_id = self._start_source(file_path, processor, loop_video=True)
+        if source_id is None:
+            print("Error: Could not open video file.")
+        return source_id
+
+    def remove_source(self, source_id):
+        with self.lock:
+            source = self.sources.pop(source_id, None)
+            if source_id == self.primary_id:
+                self.primary_id = None
+            # Nothing may keep blending from a source that is going away
+            for other in self.sources.values():
+                if other.blend_source is source:
+                    other.blend_source = None
+        if source is not None:
+            source.stop()
+
+    def set_blend_source(self, source_id, blend_source_id=None):
+        """Uses the frames of blend_source_id as the blend layer of source_id (None blends the source with itself)."""
+        with self.lock:
+            source = self.sources.get(source_id)
+            if source is None:
+                return
+            source.blend_source = self.sources.get(blend_source_id) if blend_source_id is not None else None
+
+    def _key_pressed(self, key):
+        on_key = self.on_key
+        if on_key is not None:
+            on_key(key)
+
+    def _arena_bytes(self):
+        with self.lock:
+            processors = {id(source.processor): source.processor for source in self.sources.values()}
+        processors[id(self.processor)] = self.processor
+        return sum(processor.arena.nbytes() for processor in processors.values())
+
+    def start_metrics_server(self, port=9108):
+        """Serves the session metrics in Prometheus text format on http://127.0.0.1:<port>/metrics."""
+        if self.metrics_server is None:
+            self.metrics_server = MetricsServer(self.metrics, port)
+            self.metrics_server.start()
+
+    def start_metrics_log(self, path, interval=60.0):
+        """Appends a metrics summary to a .csv or .jsonl file every interval seconds."""
+        if self.metrics_logger is None:
+            self.metrics_logger = MetricsLogger(self.metrics, path, interval)
+            self.metrics_logger.start()
+
+    def stop_metrics(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self.metrics_logger is not None:
+            self.metrics_logger.stop()
+            self.metrics_logger = None
+
+    def primary_source(self):
+        with self.lock:
+            return self.sources.get(self.primary_id)
+
+    def seek(self, frame):
+        """Jumps the main video file to the given frame."""
+        source = self.primary_source()
+        if source is not None:
+            source.seek(frame)
+
+    def set_loop_points(self, loop_in=None, loop_out=None):
+        """Sets the in and out frames the main video file loops between."""
+        source = self.primary_source()
+        if source is not None:
+            source.set_loop_points(loop_in, loop_out)
+
+    def playback_state(self):
+        """Returns the main source's last read frame, its frame count and its loop points, or None without a file."""
+        source = self.primary_source()
+        if source is None or not isinstance(source.target, str):
+            return None
+        return max(0, source.position - 1), source.frame_count(), source.loop_in, source.loop_out
+
+    def source_ids(self):
+        with self.lock:
+            return list(self.sources)
+
+    def throughput(self):
+        """Returns the processed frames per second of every source and their total."""
+        with self.lock:
+            rates = {source_id: source.throughput() for source_id, source in self.sources.items() if source.running}
+        rates["total"] = sum(rates.values())
+        return rates
+
+    def wait(self):
+        """Blocks until every source has stopped on its own (end of a file or 'q' pressed)."""
+        with self.lock:
+            threads = [source.thread for source in self.sources.values() if source.thread is not None]
+        for thread in threads:
+            thread.join()
+
+    def stop(self):
+        with self.lock:
+            sources = list(self.sources.values())
+            self.sources.clear()
+            self.primary_id = None
+        for source in sources:
+            source.stop()
 
     def close(self):
         self.stop()  # Ensure the resources are released when closing
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None